@@ -1,27 +1,81 @@
 import sys, os
-import time, json
-from datetime import datetime, date
+import time, math
+from datetime import datetime, date, timedelta
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QPushButton, QSpinBox, QLineEdit, QTextEdit, 
-                             QListWidget, QTabWidget, QFormLayout, QMessageBox, QGroupBox)
-from PyQt5.QtCore import QTimer, Qt
+                             QLabel, QPushButton, QSpinBox, QLineEdit, QCompleter, 
+                             QListView, QTabWidget, QFormLayout, QMessageBox, QGroupBox, QProgressBar)
+from PyQt5.QtCore import QTimer, Qt, QStringListModel, QEvent, QUrl, pyqtSignal
 from PyQt5.QtGui import QFont, QPalette, QColor
+from journal import EventJournal, TASK_ADDED, TOMATO_COMPLETED, INTERRUPTION, SETTINGS_CHANGED
+import core
+from models import TaskListModel
+from widgets import TimerDisplay
+import records
+from task_index import TaskIndex
+import stats
+from persistence import WriteBehindWriter, write_file
+import ipc
+import events
+import schema
+import serializers
 
 class TomatoTimer(QMainWindow):
+    # 各阶段的状态文字与计时器颜色
+    PHASE_TEXT = {
+        core.IDLE: "准备开始",
+        core.WORK: "工作中",
+        core.SHORT_BREAK: "短休息中",
+        core.LONG_BREAK: "长休息中",
+    }
+    PHASE_COLORS = {
+        core.IDLE: "#333333",
+        core.WORK: "#d32f2f",  # 红色
+        core.SHORT_BREAK: "#388e3c",  # 绿色
+        core.LONG_BREAK: "#388e3c",
+    }
+    
+    # 后台写入：合并等待时间与日志 fsync 间隔（秒）
+    FLUSH_INTERVAL = 0.5
+    FSYNC_INTERVAL = 5.0
+    
+    # 挂起恢复检查间隔（秒）：QTimer 在挂起期间不计时，恢复后由它补上阶段切换和跨天
+    WAKE_CHECK_INTERVAL = 30.0
+    
+    # 多设备同步间隔（秒）
+    SYNC_INTERVAL = 30.0
+    
+    # 完成时间预测最多覆盖的任务数（任务很多时避免拖慢界面）
+    FORECAST_LIMIT = 500
+    
+    # 后台写入失败时从写入线程发出，在界面线程中提示
+    save_failed = pyqtSignal(str)
+    # 数据加载完成、界面可以操作时发出
+    startup_finished = pyqtSignal()
+    # 后台同步结束时从同步线程发出（参数为 Future）
+    sync_done = pyqtSignal(object)
+    # 报告生成进度（从监听线程发出，参数为 ((开始, 结束), 已完成步数, 总步数, 说明)）
+    report_progress = pyqtSignal(object)
+    # 报告生成结束时发出（参数为 Future）
+    report_done = pyqtSignal(object)
+    # 统计在写入线程中重新读取后发出（参数为 (序号, {周期: Rollup})）
+    stats_reloaded = pyqtSignal(object)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("番茄工作法计时器")
         self.setGeometry(100, 100, 800, 600)
         
+        # 计时状态机（时长设置、阶段、暂停状态都保存在其中）
+        self.engine = core.SessionEngine()
+        self.engine.subscribe(self.on_engine_event)
+        self.last_phase = self.engine.phase  # 上次发布 PhaseChanged 时的阶段
+        
+        # 会话事件总线：插件在工作线程中异步处理，不阻塞计时器
+        self.bus = events.EventBus()
+        
         # 初始化变量
-        self.work_duration = 25  # 默认工作时间（分钟）
-        self.short_break_duration = 5  # 默认短休息时间（分钟）
-        self.long_break_duration = 15  # 默认长休息时间（分钟）
-        self.long_break_interval = 4  # 长休息间隔（几个番茄后）
         self.current_cycle = 0  # 当前完成的番茄数
-        self.is_working = False  # 是否在工作状态
-        self.is_paused = False  # 是否暂停
-        self.remaining_seconds = self.work_duration * 60  # 剩余秒数
+        self.remaining_seconds = self.engine.display_seconds()  # 当前显示的剩余秒数
         self.current_task = ""  # 当前任务
         self.tomatoes_planned = 1  # 计划番茄数
         self.internal_interruptions = 0  # 内部打断次数
@@ -32,69 +86,472 @@ class TomatoTimer(QMainWindow):
         self.today = date.today().strftime("%Y-%m-%d")
         self.daily_tasks = []  # 今日任务列表
         self.completed_tasks = []  # 已完成任务列表
+        self.task_index = TaskIndex()  # 按名称/编号查找任务，并提供前缀补全
+        self.forecast = {}  # 任务名 -> 预计完成时间戳
+        self.forecast_interruptions = 0.0  # 预计剩余的打断次数
+        
+        # 任务模型直接包装 daily_tasks / completed_tasks，变化时只刷新受影响的行
+        self.tasks_model = TaskListModel(
+            lambda task: f"{task.name} (计划: {task.planned}番茄, 已完成: {task.completed}){self.forecast_text(task)}",
+            self.daily_tasks, self)
+        self.completed_model = TaskListModel(
+            lambda task: f"{task.name} (完成: {task.completed}/{task.planned}番茄)",
+            self.completed_tasks, self)
         
-        # 初始化UI
+        # 初始化UI（右侧标签页在第一次显示时才创建）
+        self.started = False  # 数据是否已加载
+        self.built_tabs = set()
+        self.display_active = True  # 窗口可见（未隐藏、未最小化）时才逐秒刷新计时器
         self.init_ui()
         
         # 初始化计时器
+        # 单次触发，只在显示的秒数变化或阶段结束时唤醒
         self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.update_timer)
+        self.tick_due = None
+        
+        # 跨天检查只在午夜触发一次，不再每秒轮询
+        self.day_timer = QTimer(self)
+        self.day_timer.setSingleShot(True)
+        self.day_timer.timeout.connect(self.check_date_change)
+        self.rollover_at = None  # 下一个午夜的时间戳（系统时间）
+        self.schedule_day_rollover()
+        
+        # QTimer 与单调时钟在系统挂起期间停止，恢复后按系统时间和引擎时钟重新检查
+        self.wake_timer = QTimer(self)
+        self.wake_timer.setTimerType(Qt.VeryCoarseTimer)
+        self.wake_timer.timeout.connect(self.check_wake)
+        self.wake_timer.start(int(self.WAKE_CHECK_INTERVAL * 1000))
+        
         self.data_file = "tomato_timer_data.json"
+        self.data_dir = os.path.dirname(os.path.abspath(self.data_file))
+        
+        # 所有磁盘写入都交给后台线程，界面线程不等待 I/O
+        self.writer = WriteBehindWriter(self.FLUSH_INTERVAL, on_error=lambda e: self.save_failed.emit(str(e)))
+        self.save_failed.connect(self.show_save_error)
+        # 快照编解码器，可用环境变量 POMODORO_CODEC 选择（见 serializers.py）
+        self.codec = serializers.get_codec(os.environ.get('POMODORO_CODEC', 'json'))
+        self.journal = EventJournal(self.data_file, writer=self.writer, fsync_interval=self.FSYNC_INTERVAL,
+                                    codec=self.codec)  # 追加式事件日志
+        self.read_only = False  # 数据文件由更新版本的程序保存时，本次运行不写入数据文件
+        self.sync_client = None  # 设置 POMODORO_SYNC_URL 时在启动完成后创建
+        self.reports = None  # 报告服务，第一次生成报告时才创建进程池
+        self.reports_waiting = set()  # 正在等待结果的 (开始, 结束)
+        
+        # 计时器第一次绘制后再加载数据，先让窗口显示出来
+        self.timer_display.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        if obj is self.timer_display and event.type() == QEvent.Paint and not self.started:
+            self.timer_display.removeEventFilter(self)
+            QTimer.singleShot(0, self.finish_startup)
+        return super().eventFilter(obj, event)
+    
+    def finish_startup(self):
+        """首次绘制之后完成启动：打开历史库、加载数据、创建当前标签页"""
+        if self.started:
+            return
+        from history import HistoryStore  # sqlite3 只在这里才需要
+        from archive import HistoryArchive
+        from forecast import Forecaster
+        
+        self.history = HistoryStore(os.path.join(self.data_dir, "tomato_timer_history.db"), writer=self.writer)  # 跨日期历史库
+        self.stats = stats.StatsAggregator(self.history)  # 日/周/月增量统计
+        try:
+            self.archive = HistoryArchive(os.path.join(self.data_dir, "tomato_timer_archive.bin"))  # 已结束日期的二进制归档
+        except (OSError, ValueError) as e:
+            self.archive = None  # 归档损坏时不归档，其余功能照常
+            self.statusBar().showMessage(f"无法打开历史归档: {e}", 10000)
+        self.forecaster = Forecaster()  # 按任务的完成速度预测完成时间
+        self.forecast_file = os.path.join(self.data_dir, "tomato_timer_forecast.json")
+        try:
+            self.forecaster.load(self.forecast_file)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # 统计文件损坏时从头统计
+        self.started = True
         
         # 加载保存的数据
         self.load_data()
+        
+        # 首次创建历史库时导入已有的 JSON 数据
+        if self.history.is_new:
+            self.import_history()
+        
+        # 快照属于之前的某一天（跨夜关闭后再启动）时，先结束那一天再开始今天
+        self.check_date_change()
+        
+        # 补上尚未归档的已结束日期（首次运行或跨夜关闭期间）
+        self.archive_finished_days()
+        
+        # 设置 POMODORO_SYNC_URL 时与其他设备增量同步
+        if os.environ.get('POMODORO_SYNC_URL'):
+            self.start_sync(os.environ['POMODORO_SYNC_URL'])
+        
+        # POMODORO_PLUGINS 指定的插件订阅事件总线
+        if os.environ.get('POMODORO_PLUGINS'):
+            _, failed = events.load_plugins(self.bus, os.environ['POMODORO_PLUGINS'])
+            if failed:
+                self.statusBar().showMessage("插件加载失败: " + ", ".join(f"{name} ({e})" for name, e in failed), 10000)
+        
+        # 历史任务名也加入补全候选
+        for name in self.history.task_names():
+            self.task_index.trie.insert(name)
+        
+        self.ensure_tab_built(self.right_panel.currentIndex())
+        for group in self.action_groups:
+            group.setEnabled(True)
+        self.startup_finished.emit()
 
     def load_data(self):
-        """从文件加载保存的数据"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    
-                    # 加载设置
-                    settings = data.get('settings', {})
-                    self.work_duration = settings.get('work_duration', 25)
-                    self.short_break_duration = settings.get('short_break_duration', 5)
-                    self.long_break_duration = settings.get('long_break_duration', 15)
-                    self.long_break_interval = settings.get('long_break_interval', 4)
-                    
-                    # 更新UI中的设置值
-                    self.work_time_input.setValue(self.work_duration)
-                    self.short_break_input.setValue(self.short_break_duration)
-                    self.long_break_input.setValue(self.long_break_duration)
-                    self.long_break_interval_input.setValue(self.long_break_interval)
-                    
-                    # 加载后立即更新计时器显示
-                    self.remaining_seconds = self.work_duration * 60  # 初始化为工作时间
-                    self.timer_display.setText(self.format_time(self.remaining_seconds))
-                    
-                    # 加载统计数据和任务
-                    stats = data.get('stats', {})
-                    self.current_cycle = stats.get('completed_tomatoes', 0)
-                    self.internal_interruptions = stats.get('internal_interruptions', 0)
-                    self.external_interruptions = stats.get('external_interruptions', 0)
-                    
-                    # 加载任务列表
-                    self.daily_tasks = data.get('daily_tasks', [])
-                    self.completed_tasks = data.get('completed_tasks', [])
-                    
-                    # 更新UI
-                    self.update_stats()
-                    self.update_tasks_list()
+        """从快照加载保存的数据，并重放快照之后的日志事件"""
+        try:
+            data, replay = self.journal.load()
+            if data is not None:
+                data = schema.migrate(data)  # 旧版本数据先升级到当前格式
+                self.current_date = data.get('date', self.current_date)  # 快照所属的日期
+                
+                # 加载设置
+                settings = data.get('settings', {})
+                self.engine.update_settings(settings.get('work_duration', 25),
+                                            settings.get('short_break_duration', 5),
+                                            settings.get('long_break_duration', 15),
+                                            settings.get('long_break_interval', 4))
+                
+                # 加载任务列表
+                self.daily_tasks = records.from_dicts(data.get('daily_tasks', []))
+                self.completed_tasks = records.from_dicts(data.get('completed_tasks', []))
+                self.update_tasks_list()  # 模型先指向新列表，再重放事件
+                
+                # 加载统计数据
+                saved_stats = data.get('stats', {})
+                self.current_cycle = saved_stats.get('completed_tomatoes', 0)
+                pending = data['pending_interruptions']
+                self.internal_interruptions = pending.get('internal', 0)
+                self.external_interruptions = pending.get('external', 0)
+            
+            # 重放快照之后追加的事件
+            for event in replay:
+                self.apply_event(event)
+            
+            self.engine.current_cycle = self.current_cycle
+            
+            # 更新UI中的设置值
+            if 'settings' in self.built_tabs:
+                self.work_time_input.setValue(self.engine.work_duration)
+                self.short_break_input.setValue(self.engine.short_break_duration)
+                self.long_break_input.setValue(self.engine.long_break_duration)
+                self.long_break_interval_input.setValue(self.engine.long_break_interval)
+            
+            # 更新UI
+            self.update_stats()
+        except schema.NewerSchemaError as e:
+            # 不能用默认数据覆盖更新版本的文件：本次运行不写快照和日志
+            self.read_only = True
+            QMessageBox.warning(self, "加载错误", f"{str(e)}\n本次运行不会保存数据。")
+        except Exception as e:
+            QMessageBox.warning(self, "加载错误", f"无法加载保存的数据: {str(e)}")
+        
+        # 加载后立即更新计时器显示（加载失败时即为默认工作时间）
+        self.refresh_display()
+    
+    def apply_event(self, event):
+        """将一条日志事件应用到内存状态（实时操作与启动重放共用）"""
+        event_type = event['type']
+        if event_type == TASK_ADDED:
+            # 检查是否已存在相同任务
+            existing_task = self.task_index.pending_task(event['name'])
+            if existing_task:
+                existing_task.planned += event['planned']
+                self.tasks_model.task_changed(existing_task)
+            else:
+                task = records.TaskRecord(event['name'], event['planned'])
+                self.task_index.add(task)
+                self.tasks_model.append_task(task)
+        elif event_type == TOMATO_COMPLETED:
+            self.current_cycle += 1
+            if event['task']:
+                task = self.task_index.pending_task(event['task'])
+                if task:
+                    task.completed += 1
+                    task.internal_interruptions += self.internal_interruptions
+                    task.external_interruptions += self.external_interruptions
                     
-            except Exception as e:
-                QMessageBox.warning(self, "加载错误", f"无法加载保存的数据: {str(e)}")
-                # 加载失败时使用默认值初始化计时器
-                self.remaining_seconds = self.work_duration * 60
-                self.timer_display.setText(self.format_time(self.remaining_seconds))
+                    # 如果完成数达到计划数，移动到已完成列表
+                    if task.completed >= task.planned:
+                        self.task_index.mark_completed(task)
+                        self.tasks_model.remove_task(task)
+                        self.completed_model.append_task(task)
+                    else:
+                        self.tasks_model.task_changed(task)
+                
+                self.internal_interruptions = 0
+                self.external_interruptions = 0
+        elif event_type == INTERRUPTION:
+            if event['kind'] == 'internal':
+                self.internal_interruptions += 1
+            else:
+                self.external_interruptions += 1
+        elif event_type == SETTINGS_CHANGED:
+            self.engine.update_settings(event['work_duration'],
+                                        event['short_break_duration'],
+                                        event['long_break_duration'],
+                                        event['long_break_interval'])
+    
+    def record_event(self, event_type, **payload):
+        """应用事件并追加到日志，日志过长时压缩为快照"""
+        credit = self.tomato_credit(payload) if event_type == TOMATO_COMPLETED else None
+        self.apply_event(dict(payload, type=event_type))
+        try:
+            if not self.read_only:
+                self.journal.append(event_type, **payload)
+        except Exception as e:
+            QMessageBox.warning(self, "保存错误", f"无法保存数据: {str(e)}")
+            return
+        self.update_rollups(event_type, payload, credit)
+        self.record_history(event_type, payload, credit)
+        self.record_sync(event_type, payload)
+        self.update_forecast(event_type, payload)
+        self.publish_event(event_type, payload)
+        if self.journal.needs_compaction():
+            self.save_data()
+    
+    def find_task(self, name):
+        """按名称查找今日任务（未完成或已完成）"""
+        return self.task_index.find(name)
+    
+    def tomato_credit(self, payload):
+        """番茄计入的任务带走的打断 (内部, 外部)，不计入任务时为 None（需在应用事件之前调用）"""
+        if payload['task'] and self.task_index.pending_task(payload['task']) is not None:
+            return self.internal_interruptions, self.external_interruptions
+        return None
+    
+    def update_rollups(self, event_type, payload, credit=None):
+        """把实时事件累加到日/周/月统计（需在写入历史库之前调用）"""
+        if event_type == TASK_ADDED:
+            self.stats.add(self.current_date, planned=payload['planned'])
+        elif event_type == TOMATO_COMPLETED:
+            self.stats.add(self.current_date, tomatoes=1, completed=0 if credit is None else 1)
+        elif event_type == INTERRUPTION:
+            if payload['kind'] == 'internal':
+                self.stats.add(self.current_date, internal=1)
+            else:
+                self.stats.add(self.current_date, external=1)
+    
+    def record_history(self, event_type, payload, credit=None):
+        """将实时事件写入 SQLite 历史库（启动重放日志时不调用）
+
+        任务计数按增量累加：同一天完成后又添加的同名任务与之前的记录合计，不会覆盖已完成的计数。
+        """
+        try:
+            if event_type == TASK_ADDED:
+                self.history.add_task_counts(self.current_date, payload['name'], planned=payload['planned'])
+            elif event_type == TOMATO_COMPLETED:
+                self.history.add_tomato(self.current_date, payload['task'])
+                if credit is not None:
+                    self.history.add_task_counts(self.current_date, payload['task'], completed=1,
+                                                 internal_interruptions=credit[0], external_interruptions=credit[1])
+            elif event_type == INTERRUPTION:
+                self.history.add_interruption(self.current_date, self.current_task, payload['kind'], self.engine.phase)
+        except Exception as e:
+            QMessageBox.warning(self, "保存错误", f"无法写入历史记录: {str(e)}")
+        self.invalidate_reports(self.current_date)
+    
+    def record_sync(self, event_type, payload):
+        """本机任务计数变化后更新同步副本中本机的分量"""
+        if self.sync_client is None:
+            return
+        if event_type == TASK_ADDED:
+            self.observe_sync(self.current_date, payload['name'])
+        elif event_type == TOMATO_COMPLETED and payload['task']:
+            self.observe_sync(self.current_date, payload['task'])
+    
+    def task_totals(self, name):
+        """今天同名任务的合计计数（完成后又添加的同名任务与之前的任务合计，与历史库的一行对应）"""
+        totals = records.TaskRecord(name)
+        for task in self.daily_tasks + self.completed_tasks:
+            if task.name == name:
+                for field in records.COUNTER_FIELDS:
+                    setattr(totals, field, getattr(totals, field) + getattr(task, field))
+        return totals
+    
+    def observe_sync(self, day, name):
+        """在后台写入线程中更新同步副本（SQLite 提交不在界面线程中执行，同一任务的连续更新合并）
+
+        同步的是这一天同名任务的合计，合并排队中的更新时只保留最新的合计，不会丢失计数。
+        """
+        replica = self.sync_client.replica
+        totals = self.task_totals(name)
+        self.writer.submit(("sync", day, name), lambda: replica.observe(day, totals))
+    
+    def start_sync(self, url):
+        """开始定期与同步服务器交换增量（网络请求在后台线程中执行）"""
+        from concurrent.futures import ThreadPoolExecutor
+        from sync import SyncReplica, SyncClient
+        
+        replica = SyncReplica(os.path.join(self.data_dir, "tomato_timer_sync.db"))
+        self.sync_client = SyncClient(replica, url)
+        if replica.is_new:
+            # 首次启用同步时，今天已有的计数作为本机分量
+            for name in dict.fromkeys(task.name for task in self.daily_tasks + self.completed_tasks):
+                self.observe_sync(self.current_date, name)
+        self.sync_executor = ThreadPoolExecutor(1, thread_name_prefix="sync")
+        self.sync_future = None
+        self.sync_done.connect(self.on_sync_done)
+        self.stats_reloaded.connect(self.on_stats_reloaded)
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.request_sync)
+        self.sync_timer.start(int(self.SYNC_INTERVAL * 1000))
+        self.request_sync()
+    
+    def request_sync(self):
+        """在同步线程中执行一次同步（上一次尚未结束时跳过）"""
+        if self.sync_future is not None and not self.sync_future.done():
+            return
+        self.sync_future = self.sync_executor.submit(self.run_sync)
+        self.sync_future.add_done_callback(self.sync_done.emit)
+    
+    def run_sync(self):
+        """（同步线程）同步一次，返回计数变化的 {(日期, 任务): 合并后的计数}"""
+        self.writer.flush()  # 先写完排队中的副本更新，推送包含最新的本机计数
+        replica = self.sync_client.replica
+        return {key: replica.totals(*key) for key in self.sync_client.sync()}
+    
+    def publish_event(self, event_type, payload):
+        """把番茄完成和打断发布到事件总线"""
+        if event_type == TOMATO_COMPLETED:
+            self.bus.publish(events.TomatoCompleted(payload['task'], self.current_cycle, self.current_date))
+        elif event_type == INTERRUPTION:
+            self.bus.publish(events.InterruptionRecorded(payload['kind'], self.current_task,
+                                                         self.engine.phase, self.current_date))
+    
+    def update_forecast(self, event_type, payload):
+        """番茄完成或打断时在线更新完成速度（O(1)），然后重新预测"""
+        if event_type == TOMATO_COMPLETED:
+            self.forecaster.observe_tomato(payload['task'], time.time(), self.engine, self.current_cycle)
+            data = self.forecaster.to_dict()
+            self.writer.submit(("forecast",), lambda: self.forecaster.save(self.forecast_file, data))
+        elif event_type == INTERRUPTION:
+            self.forecaster.observe_interruption()
+        self.refresh_forecast()
+    
+    def refresh_forecast(self):
+        """重新预测今日任务的完成时间，只刷新显示的预计时间变化了的行和预测标签"""
+        if not self.started:
+            return
+        queue = [(task.name, task.planned - task.completed) for task in self.daily_tasks[:self.FORECAST_LIMIT]]
+        previous = self.forecast
+        self.forecast, self.forecast_interruptions = self.forecaster.project(
+            queue, time.time(), self.engine, self.current_cycle, self.current_task)
+        for name in previous.keys() | self.forecast.keys():
+            old, new = previous.get(name), self.forecast.get(name)
+            if old is None or new is None or self.format_clock(old) != self.format_clock(new):
+                task = self.task_index.pending_task(name)
+                if task is not None:
+                    self.tasks_model.task_changed(task)
+        self.update_forecast_label()
+    
+    def forecast_text(self, task):
+        """任务列表中显示的预计完成时间"""
+        finish = self.forecast.get(task.name)
+        return "" if finish is None else f" - 预计 {self.format_clock(finish)} 完成"
+    
+    def format_clock(self, timestamp):
+        """时间戳显示为 HH:MM，不是今天时加上日期"""
+        moment = datetime.fromtimestamp(timestamp)
+        return moment.strftime("%H:%M" if moment.date() == date.today() else "%m-%d %H:%M")
+    
+    def update_forecast_label(self):
+        """更新任务标签页中的整体预测"""
+        if 'tasks' not in self.built_tabs:
+            return
+        if not self.forecast:
+            self.forecast_label.setText("预计完成: -")
+            return
+        text = f"预计 {self.format_clock(max(self.forecast.values()))} 全部完成，期间约打断 {self.forecast_interruptions:.0f} 次"
+        if len(self.daily_tasks) > self.FORECAST_LIMIT:
+            text += f"（只计算前 {self.FORECAST_LIMIT} 个任务）"
+        self.forecast_label.setText(text)
+    
+    def on_sync_done(self, future):
+        """同步完成后（界面线程）把其他设备带来的变化写入任务列表和历史库"""
+        try:
+            touched = future.result()
+        except Exception as e:
+            self.statusBar().showMessage(f"同步失败: {str(e)}", 5000)
+            return
+        if not touched:
+            return
+        for (day, name), totals in sorted(touched.items()):
+            merged = records.TaskRecord(name, **totals)
+            if day == self.current_date:
+                merged = self.apply_merged_task(merged)
+            self.history.save_task(day, merged)
+            self.invalidate_reports(day)
+        self.save_data()
+        self.reload_stats()
+        self.refresh_forecast()
+        self.statusBar().showMessage(f"已同步 {len(touched)} 个任务的变化", 3000)
+    
+    def reload_stats(self):
+        """在写入线程中排在已提交的历史写入之后重新读取统计，界面线程不等待写入"""
+        seq = self.stats.begin_reload()
+        day = self.current_date
+        self.writer.submit(None, lambda: self.stats_reloaded.emit((seq, self.stats.read_periods(day))))
+    
+    def on_stats_reloaded(self, item):
+        """（界面线程）用重新读取的统计替换缓存"""
+        if self.stats.finish_reload(*item):
+            self.update_stats()
+    
+    def apply_merged_task(self, merged):
+        """用合并后的计数更新今天的同名任务（计数只增不减），返回这一天同名任务的合计
+
+        merged 是同名任务的合计，只把超出本机合计的部分加到一个任务上（优先未完成的）。
+        """
+        task = self.find_task(merged.name)
+        if task is None:
+            task = merged
+            self.task_index.add(task)
+            self.tasks_model.append_task(task)
+        else:
+            local = self.task_totals(merged.name)
+            for field in records.COUNTER_FIELDS:
+                setattr(task, field, getattr(task, field) + max(0, getattr(merged, field) - getattr(local, field)))
+        
+        # 合并后完成数与计划数的关系可能变化，在两个列表之间移动
+        pending = self.task_index.pending_task(task.name) is task
+        if pending and task.completed >= task.planned:
+            self.task_index.mark_completed(task)
+            self.tasks_model.remove_task(task)
+            self.completed_model.append_task(task)
+        elif not pending and task.completed < task.planned:
+            self.task_index.mark_pending(task)
+            self.completed_model.remove_task(task)
+            self.tasks_model.append_task(task)
         else:
-            # 新文件时使用默认值初始化计时器
-            self.remaining_seconds = self.work_duration * 60
-            self.timer_display.setText(self.format_time(self.remaining_seconds))
+            (self.tasks_model if pending else self.completed_model).task_changed(task)
+        return self.task_totals(task.name)
+    
+    def import_history(self):
+        """把按日期保存的 JSON 文件和今天的数据导入历史库"""
+        try:
+            _, failed = self.history.import_json_dir(self.data_dir)
+            self.history.import_day(self.current_date, self.daily_tasks + self.completed_tasks)
+        except Exception as e:
+            QMessageBox.warning(self, "导入错误", f"无法导入历史数据: {str(e)}")
+        else:
+            if failed:
+                QMessageBox.warning(self, "导入错误", "以下文件无法导入历史数据:\n" + "\n".join(
+                    f"{os.path.basename(path)}: {e}" for path, e in failed))
+        self.stats.invalidate()
+        self.update_stats()
     
     def reset_daily_data(self):
         """重置每日数据（保留设置）"""
         self.current_cycle = 0
+        self.engine.current_cycle = 0
         self.internal_interruptions = 0
         self.external_interruptions = 0
         self.daily_tasks = []
@@ -108,43 +565,98 @@ class TomatoTimer(QMainWindow):
         self.save_data()
     
     def save_data(self):
-        """保存数据到文件"""
+        """将完整状态写成快照并清空日志（只读运行时不写入），返回快照数据，未写入时返回 None"""
+        if self.read_only:
+            return None
+        today = self.stats.rollup(stats.DAY, self.current_date)
         data = {
+            'schema_version': schema.SCHEMA_VERSION,
             'date': self.current_date,
             'settings': {
-                'work_duration': self.work_duration,
-                'short_break_duration': self.short_break_duration,
-                'long_break_duration': self.long_break_duration,
-                'long_break_interval': self.long_break_interval
+                'work_duration': self.engine.work_duration,
+                'short_break_duration': self.engine.short_break_duration,
+                'long_break_duration': self.engine.long_break_duration,
+                'long_break_interval': self.engine.long_break_interval
             },
             'stats': {
                 'completed_tomatoes': self.current_cycle,
-                'internal_interruptions': sum(t['internal_interruptions'] for t in self.completed_tasks) + self.internal_interruptions,
-                'external_interruptions': sum(t['external_interruptions'] for t in self.completed_tasks) + self.external_interruptions
+                'internal_interruptions': today.internal,
+                'external_interruptions': today.external
             },
-            'daily_tasks': self.daily_tasks,
-            'completed_tasks': self.completed_tasks
+            'pending_interruptions': {
+                'internal': self.internal_interruptions,
+                'external': self.external_interruptions
+            },
+            'daily_tasks': records.to_dicts(self.daily_tasks),
+            'completed_tasks': records.to_dicts(self.completed_tasks)
         }
         
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=4)
+            self.journal.write_snapshot(data)
         except Exception as e:
             QMessageBox.warning(self, "保存错误", f"无法保存数据: {str(e)}")
+            return None
+        return data
     
     def check_date_change(self):
         """检查日期变化，如果是新的一天则重置每日数据"""
         today = date.today().strftime("%Y-%m-%d")
         if today != self.current_date:
+            previous_day = self.current_date
+            # 前一天的数据写成快照（此时 current_date 仍是前一天，快照的日期和统计才正确），
+            # 并在写入线程中另存为按日期命名的文件，然后在同一个数据文件中开始新的一天。
+            # 数据文件中的快照随后会被新一天的快照替换，因此按日期命名的文件直接用编码后的数据写出
+            data = self.save_data()
+            if data is not None:
+                path = os.path.join(self.data_dir, f"{previous_day}.json")
+                raw = self.journal.codec.encode(data)
+                self.writer.submit(("day-file", path), lambda: write_file(path, raw))
             self.current_date = today
-            self.data_file = os.path.join(self.data_dir, f"{self.current_date}.json")
+            self.today = today
             self.reset_daily_data()
+            self.archive_finished_days()
+            self.bus.publish(events.DayRolledOver(previous_day, today))
+        self.schedule_day_rollover()
+    
+    def archive_finished_days(self):
+        """在后台写入线程中把今天之前的历史追加到二进制归档（排在已提交的历史写入之后）"""
+        if self.archive is None:
+            return
+        today = self.current_date
+        self.writer.submit(("archive",), lambda: self.archive.catch_up(self.history, today))
+    
+    def schedule_day_rollover(self):
+        """安排在下一个午夜检查日期变化"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self.rollover_at = midnight.timestamp()
+        # 多等一秒，避免时钟误差导致提前触发时日期还没变
+        self.day_timer.start(int((midnight - now).total_seconds() * 1000) + 1000)
     
     def closeEvent(self, event):
         """窗口关闭时保存数据"""
-        self.save_data()
+        if self.started:
+            self.save_data()
+        if self.sync_client is not None:
+            self.sync_timer.stop()
+            self.sync_executor.shutdown(wait=True)
+            self.writer.flush()  # 排队中的副本更新写完后再关闭
+            self.sync_client.replica.close()
+        self.bus.close()  # 慢插件最多等待 1 秒
+        self.writer.close()  # 等待后台写入全部完成
+        if self.reports is not None:
+            self.reports.close()
+        self.journal.close()
+        if self.started:
+            self.history.close()
+            if self.archive is not None:
+                self.archive.close()
         event.accept()
     
+    def show_save_error(self, message):
+        """提示后台写入失败"""
+        QMessageBox.warning(self, "保存错误", f"无法保存数据: {message}")
+    
     def save_settings(self):
         """保存设置"""
         # 获取新设置值
@@ -153,33 +665,17 @@ class TomatoTimer(QMainWindow):
         new_long_break = self.long_break_input.value()
         new_interval = self.long_break_interval_input.value()
         
-        # 计算时间变化比例（用于正在运行的计时器）
-        time_ratio = 1
-        if self.is_working and self.work_duration > 0:
-            time_ratio = new_work_duration / self.work_duration
-        
-        # 更新设置
-        self.work_duration = new_work_duration
-        self.short_break_duration = new_short_break
-        self.long_break_duration = new_long_break
-        self.long_break_interval = new_interval
-        
-        # 更新计时器显示
-        if self.is_working:
-            # 如果是工作时间，按比例调整剩余时间
-            self.remaining_seconds = int(self.remaining_seconds * time_ratio)
-        elif self.is_paused:
-            # 如果暂停状态，保持当前显示不变
-            pass
-        else:
-            # 如果未开始，重置为新的工作时间
-            self.remaining_seconds = self.work_duration * 60
+        # 更新设置（工作阶段中由状态机按比例调整剩余时间）
+        self.record_event(SETTINGS_CHANGED,
+                          work_duration=new_work_duration,
+                          short_break_duration=new_short_break,
+                          long_break_duration=new_long_break,
+                          long_break_interval=new_interval)
         
         # 更新显示
-        self.timer_display.setText(self.format_time(self.remaining_seconds))
+        self.refresh_display()
+        self.schedule_tick()
         
-        # 保存设置
-        self.save_data()
         QMessageBox.information(self, "设置已保存", "计时器设置已成功更新！")
         
     def init_ui(self):
@@ -193,9 +689,7 @@ class TomatoTimer(QMainWindow):
         left_layout = QVBoxLayout(left_panel)
         
         # 计时器显示
-        self.timer_display = QLabel(self.format_time(self.remaining_seconds))
-        self.timer_display.setAlignment(Qt.AlignCenter)
-        self.timer_display.setFont(QFont("Arial", 48, QFont.Bold))
+        self.timer_display = TimerDisplay(self.format_time(self.remaining_seconds), QFont("Arial", 48, QFont.Bold))
         left_layout.addWidget(self.timer_display)
         
         # 状态显示
@@ -243,6 +737,13 @@ class TomatoTimer(QMainWindow):
         
         self.task_input = QLineEdit()
         self.task_input.setPlaceholderText("输入任务内容")
+        
+        # 任务名自动补全：候选由前缀树按当前输入生成，补全器本身不再过滤
+        self.task_completer_model = QStringListModel(self)
+        self.task_completer = QCompleter(self.task_completer_model, self)
+        self.task_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.task_input.setCompleter(self.task_completer)
+        self.task_input.textEdited.connect(self.update_task_completions)
         task_layout.addRow("任务内容:", self.task_input)
         
         self.tomatoes_input = QSpinBox()
@@ -256,55 +757,92 @@ class TomatoTimer(QMainWindow):
         
         left_layout.addWidget(task_group)
         
-        # 右侧面板（设置和记录）
-        right_panel = QTabWidget()
+        # 右侧面板（设置和记录），各标签页第一次显示时才创建内容
+        self.right_panel = QTabWidget()
+        self.tab_builders = {}
+        for key, title, builder in (("settings", "设置", self.build_settings_tab),
+                                    ("tasks", "任务记录", self.build_tasks_tab),
+                                    ("stats", "统计", self.build_stats_tab)):
+            page = QWidget()
+            page.setProperty("tab_key", key)
+            self.tab_builders[key] = builder
+            self.right_panel.addTab(page, title)
+        self.right_panel.currentChanged.connect(self.ensure_tab_built)
+        
+        # 数据加载完成前禁用操作
+        self.action_groups = [control_group, interrupt_group, task_group]
+        for group in self.action_groups:
+            group.setEnabled(False)
+        
+        # 将左右面板添加到主布局
+        main_layout.addWidget(left_panel, 2)
+        main_layout.addWidget(self.right_panel, 1)
+        
+        # 状态栏用于不打断操作的提示
+        self.statusBar()
         
-        # 设置标签页
-        settings_tab = QWidget()
+        # 设置样式
+        self.set_style()
+    
+    def ensure_tab_built(self, index):
+        """第一次显示某个标签页时创建其内容（数据加载完成前不创建）"""
+        page = self.right_panel.widget(index)
+        key = page.property("tab_key") if page is not None else None
+        if not self.started or key is None or key in self.built_tabs:
+            return
+        self.built_tabs.add(key)
+        self.tab_builders[key](page)
+    
+    def build_settings_tab(self, settings_tab):
+        """创建设置标签页"""
         settings_layout = QFormLayout(settings_tab)
         
         self.work_time_input = QSpinBox()
         self.work_time_input.setMinimum(1)
-        self.work_time_input.setValue(self.work_duration)
+        self.work_time_input.setValue(self.engine.work_duration)
         settings_layout.addRow("工作时间 (分钟):", self.work_time_input)
         
         self.short_break_input = QSpinBox()
         self.short_break_input.setMinimum(1)
-        self.short_break_input.setValue(self.short_break_duration)
+        self.short_break_input.setValue(self.engine.short_break_duration)
         settings_layout.addRow("短休息时间 (分钟):", self.short_break_input)
         
         self.long_break_input = QSpinBox()
         self.long_break_input.setMinimum(1)
-        self.long_break_input.setValue(self.long_break_duration)
+        self.long_break_input.setValue(self.engine.long_break_duration)
         settings_layout.addRow("长休息时间 (分钟):", self.long_break_input)
         
         self.long_break_interval_input = QSpinBox()
         self.long_break_interval_input.setMinimum(1)
-        self.long_break_interval_input.setValue(self.long_break_interval)
+        self.long_break_interval_input.setValue(self.engine.long_break_interval)
         settings_layout.addRow("长休息间隔 (番茄数):", self.long_break_interval_input)
         
         save_settings_button = QPushButton("保存设置")
         save_settings_button.clicked.connect(self.save_settings)
         settings_layout.addRow(save_settings_button)
-        
-        right_panel.addTab(settings_tab, "设置")
-        
-        # 今日任务标签页
-        tasks_tab = QWidget()
+    
+    def build_tasks_tab(self, tasks_tab):
+        """创建今日任务标签页"""
         tasks_layout = QVBoxLayout(tasks_tab)
         
-        self.tasks_list = QListWidget()
+        self.forecast_label = QLabel("预计完成: -")
+        tasks_layout.addWidget(self.forecast_label)
+        
+        self.tasks_list = QListView()
+        self.tasks_list.setModel(self.tasks_model)
+        self.tasks_list.setUniformItemSizes(True)
         tasks_layout.addWidget(QLabel("今日任务:"))
         tasks_layout.addWidget(self.tasks_list)
         
-        self.completed_list = QListWidget()
+        self.completed_list = QListView()
+        self.completed_list.setModel(self.completed_model)
+        self.completed_list.setUniformItemSizes(True)
         tasks_layout.addWidget(QLabel("已完成任务:"))
         tasks_layout.addWidget(self.completed_list)
-        
-        right_panel.addTab(tasks_tab, "任务记录")
-        
-        # 统计标签页
-        stats_tab = QWidget()
+        self.update_forecast_label()
+    
+    def build_stats_tab(self, stats_tab):
+        """创建统计标签页"""
         stats_layout = QFormLayout(stats_tab)
         
         self.today_label = QLabel(f"日期: {self.today}")
@@ -319,14 +857,35 @@ class TomatoTimer(QMainWindow):
         self.external_interruptions_label = QLabel("外部打断: 0")
         stats_layout.addRow(self.external_interruptions_label)
         
-        right_panel.addTab(stats_tab, "统计")
+        self.completion_ratio_label = QLabel("完成率: 0%")
+        stats_layout.addRow(self.completion_ratio_label)
         
-        # 将左右面板添加到主布局
-        main_layout.addWidget(left_panel, 2)
-        main_layout.addWidget(right_panel, 1)
+        self.week_stats_label = QLabel("本周: -")
+        stats_layout.addRow(self.week_stats_label)
         
-        # 设置样式
-        self.set_style()
+        self.month_stats_label = QLabel("本月: -")
+        stats_layout.addRow(self.month_stats_label)
+        
+        # 报告在子进程中生成，进度显示在这里
+        report_layout = QHBoxLayout()
+        self.week_report_button = QPushButton("本周报告")
+        self.week_report_button.clicked.connect(lambda: self.request_report(stats.WEEK))
+        report_layout.addWidget(self.week_report_button)
+        self.month_report_button = QPushButton("本月报告")
+        self.month_report_button.clicked.connect(lambda: self.request_report(stats.MONTH))
+        report_layout.addWidget(self.month_report_button)
+        stats_layout.addRow(report_layout)
+        
+        self.report_progress_bar = QProgressBar()
+        self.report_progress_bar.setValue(0)
+        stats_layout.addRow(self.report_progress_bar)
+        
+        self.report_label = QLabel("")
+        self.report_label.setTextFormat(Qt.RichText)
+        self.report_label.setOpenExternalLinks(True)
+        stats_layout.addRow(self.report_label)
+        
+        self.update_stats()
     
     def set_style(self):
         # 设置应用样式
@@ -365,7 +924,7 @@ class TomatoTimer(QMainWindow):
             QPushButton:disabled {
                 background-color: #cccccc;
             }
-            QListWidget {
+            QListView {
                 border: 1px solid #ddd;
                 border-radius: 3px;
                 background-color: white;
@@ -396,9 +955,7 @@ class TomatoTimer(QMainWindow):
         """)
         
         # 设置计时器颜色
-        palette = self.timer_display.palette()
-        palette.setColor(QPalette.WindowText, QColor("#333333"))
-        self.timer_display.setPalette(palette)
+        self.timer_display.setColor("#333333")
         
         # 设置状态标签颜色
         palette = self.status_label.palette()
@@ -413,98 +970,126 @@ class TomatoTimer(QMainWindow):
     
     def start_timer(self):
         """开始计时器"""
-        if not self.is_working and not self.is_paused:
+        if self.engine.phase == core.IDLE:
             # 新开始一个番茄
             self.current_task = self.task_input.text()
             self.tomatoes_planned = self.tomatoes_input.value()
-            self.is_working = True
-            self.remaining_seconds = self.work_duration * 60
-            self.status_label.setText("工作中")
-            self.start_button.setEnabled(False)
-            self.pause_button.setEnabled(True)
-            
-            # 更新UI颜色为工作状态
-            palette = self.timer_display.palette()
-            palette.setColor(QPalette.WindowText, QColor("#d32f2f"))  # 红色
-            self.timer_display.setPalette(palette)
+            self.engine.start()
             
             # 如果任务内容不为空，添加到今日任务
-            if self.current_task and self.current_task not in [task['name'] for task in self.daily_tasks]:
+            if self.current_task and self.task_index.pending_task(self.current_task) is None:
                 self.add_task()
-        elif self.is_paused:
+        elif self.engine.is_paused:
             # 从暂停状态恢复
-            self.is_paused = False
-            self.status_label.setText("工作中" if self.is_working else "休息中")
-            self.start_button.setEnabled(False)
-            self.pause_button.setEnabled(True)
+            self.engine.start()
         
-        self.timer.start(1000)  # 每秒更新一次
+        self.schedule_tick()
     
     def pause_timer(self):
         """暂停计时器"""
-        self.is_paused = True
         self.timer.stop()
-        self.status_label.setText("已暂停")
-        self.start_button.setEnabled(True)
-        self.pause_button.setEnabled(False)
+        self.engine.pause()
     
     def reset_timer(self):
         """重置计时器"""
         self.timer.stop()
-        self.is_working = False
-        self.is_paused = False
-        self.remaining_seconds = self.work_duration * 60  # 使用当前设置的工作时间
-        self.timer_display.setText(self.format_time(self.remaining_seconds))
-        self.status_label.setText("准备开始")
-        self.start_button.setEnabled(True)
-        self.pause_button.setEnabled(False)
-        
-        # 重置UI颜色
-        palette = self.timer_display.palette()
-        palette.setColor(QPalette.WindowText, QColor("#333333"))
-        self.timer_display.setPalette(palette)
+        self.engine.reset()
+        self.refresh_display()
     
-    def update_timer(self):
-        self.check_date_change()
-        """更新计时器显示"""
-        if self.remaining_seconds > 0:
-            self.remaining_seconds -= 1
-            self.timer_display.setText(self.format_time(self.remaining_seconds))
+    def on_engine_event(self, event, engine):
+        """状态机事件回调：更新界面，番茄完成时记录任务"""
+        if event == core.TOMATO_COMPLETED:
+            # 标记任务完成（同时累加已完成番茄数）
+            self.mark_task_completed()
+            return
+        
+        # 状态、按钮与颜色
+        if engine.is_paused:
+            self.status_label.setText("已暂停")
         else:
+            self.status_label.setText(self.PHASE_TEXT[engine.phase])
+        self.start_button.setEnabled(engine.phase == core.IDLE or engine.is_paused)
+        self.pause_button.setEnabled(engine.is_running)
+        
+        if event == core.PHASE_CHANGED or engine.phase == core.IDLE:
+            self.timer_display.setColor(self.PHASE_COLORS[engine.phase])
+            self.refresh_display()
+        
+        # 阶段变化（包括从未开始进入工作）发布到事件总线
+        if engine.phase != self.last_phase:
+            if self.last_phase == core.IDLE and engine.phase == core.WORK:
+                self.bus.publish(events.SessionStarted(self.current_task, self.current_date))
+            self.bus.publish(events.PhaseChanged(self.last_phase, engine.phase, engine.current_cycle))
+            self.last_phase = engine.phase
+        
+        # 开始、暂停、阶段变化都会改变预计完成时间
+        self.refresh_forecast()
+    
+    def refresh_display(self):
+        """剩余整秒数变化时才更新计时器显示（窗口隐藏或最小化时跳过）"""
+        if not self.display_active:
+            return
+        seconds = self.engine.display_seconds()
+        if seconds != self.remaining_seconds:
+            self.remaining_seconds = seconds
+            self.timer_display.setText(self.format_time(seconds))
+    
+    def schedule_tick(self):
+        """安排在显示的秒数下一次变化（或阶段结束）时唤醒
+
+        窗口不可见时不需要逐秒刷新，只在阶段结束时唤醒一次。
+        """
+        wait = self.engine.next_wakeup()
+        if wait is not None and not self.display_active:
+            wait = self.engine.seconds_left()
+        if wait is None:
             self.timer.stop()
-            if self.is_working:
-                # 工作时间结束，开始休息
-                self.is_working = False
-                self.current_cycle += 1
-                self.completed_tomatoes_label.setText(f"已完成番茄: {self.current_cycle}")
-                
-                # 检查是否需要长休息
-                if self.current_cycle % self.long_break_interval == 0:
-                    self.remaining_seconds = self.long_break_duration * 60
-                    self.status_label.setText("长休息中")
-                else:
-                    self.remaining_seconds = self.short_break_duration * 60
-                    self.status_label.setText("短休息中")
-                
-                # 更新UI颜色为休息状态
-                palette = self.timer_display.palette()
-                palette.setColor(QPalette.WindowText, QColor("#388e3c"))  # 绿色
-                self.timer_display.setPalette(palette)
-                
-                # 标记任务完成
-                self.mark_task_completed()
-            else:
-                # 休息时间结束，开始工作
-                self.is_working = True
-                self.remaining_seconds = self.work_duration * 60
-                self.status_label.setText("工作中")
-                
-                # 更新UI颜色为工作状态
-                palette = self.timer_display.palette()
-                palette.setColor(QPalette.WindowText, QColor("#d32f2f"))  # 红色
-                self.timer_display.setPalette(palette)
-            
-            self.timer.start(1000)
+            self.tick_due = None
+        else:
+            interval = max(1, math.ceil(wait * 1000))
+            self.tick_due = time.monotonic() + interval / 1000  # 预期唤醒时间，用于统计唤醒延迟
+            self.timer.start(interval)
+    
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.on_visibility_changed()
+        super().changeEvent(event)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.on_visibility_changed()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.on_visibility_changed()
+    
+    def on_visibility_changed(self):
+        """窗口隐藏/最小化时停止逐秒刷新，重新可见时立即补上显示并恢复"""
+        active = self.isVisible() and not self.isMinimized()
+        if active == self.display_active:
+            return
+        self.display_active = active
+        if active:
+            self.refresh_display()
+        if self.engine.is_running:
+            self.schedule_tick()
+    
+    def check_wake(self):
+        """系统挂起恢复后，已经过了午夜或阶段截止时间而定时器还没触发时立即处理"""
+        if not self.started:
+            return
+        if time.time() >= self.rollover_at:
+            self.check_date_change()
+        if self.engine.is_running and self.engine.seconds_left() <= 0:
+            self.update_timer()
+    
+    def update_timer(self):
+        """推进状态机并更新计时器显示"""
+        if self.started and time.time() >= self.rollover_at:
+            self.check_date_change()  # 挂起期间错过了午夜
+        self.engine.advance()
+        self.refresh_display()
+        self.schedule_tick()
     
     def add_task(self):
         """添加任务到今日任务列表"""
@@ -512,86 +1097,184 @@ class TomatoTimer(QMainWindow):
         tomatoes = self.tomatoes_input.value()
         
         if task_name:
-            task = {
-                'name': task_name,
-                'planned': tomatoes,
-                'completed': 0,
-                'internal_interruptions': 0,
-                'external_interruptions': 0
-            }
-            
-            # 检查是否已存在相同任务
-            existing_task = next((t for t in self.daily_tasks if t['name'] == task_name), None)
-            if existing_task:
-                existing_task['planned'] += tomatoes
-            else:
-                self.daily_tasks.append(task)
+            self.record_event(TASK_ADDED, name=task_name, planned=tomatoes)
             
-            self.update_tasks_list()
             self.task_input.clear()
             self.tomatoes_input.setValue(1)
-            self.save_data()  # 保存任务
         else:
             QMessageBox.warning(self, "错误", "请输入任务内容！")
     
     def mark_task_completed(self):
-        """标记当前任务完成一个番茄"""
-        if self.current_task:
-            for task in self.daily_tasks:
-                if task['name'] == self.current_task:
-                    task['completed'] += 1
-                    task['internal_interruptions'] += self.internal_interruptions
-                    task['external_interruptions'] += self.external_interruptions
-                    
-                    # 如果完成数达到计划数，移动到已完成列表
-                    if task['completed'] >= task['planned']:
-                        self.daily_tasks.remove(task)
-                        self.completed_tasks.append(task)
-                    
-                    break
-            
-            self.internal_interruptions = 0
-            self.external_interruptions = 0
-            self.update_tasks_list()
-            self.update_stats()
-            self.save_data()  # 保存任务状态
+        """记录完成一个番茄，并计入当前任务"""
+        self.record_event(TOMATO_COMPLETED, task=self.current_task)
+        self.update_stats()
     
     def update_tasks_list(self):
-        """更新任务列表显示"""
-        self.tasks_list.clear()
-        for task in self.daily_tasks:
-            item_text = f"{task['name']} (计划: {task['planned']}番茄, 已完成: {task['completed']})"
-            self.tasks_list.addItem(item_text)
-        
-        self.completed_list.clear()
-        for task in self.completed_tasks:
-            item_text = f"{task['name']} (完成: {task['completed']}/{task['planned']}番茄)"
-            self.completed_list.addItem(item_text)
+        """任务列表被整体替换后（加载、每日重置）让模型和索引指向新列表"""
+        self.task_index.rebuild(self.daily_tasks, self.completed_tasks)
+        self.tasks_model.set_tasks(self.daily_tasks)
+        self.completed_model.set_tasks(self.completed_tasks)
+        self.refresh_forecast()
+    
+    def update_task_completions(self, text):
+        """按输入前缀从前缀树中取补全候选"""
+        self.task_completer_model.setStringList(self.task_index.trie.complete(text) if text else [])
     
     def update_stats(self):
-        """更新统计信息"""
-        total_internal = sum(t['internal_interruptions'] for t in self.completed_tasks) + self.internal_interruptions
-        total_external = sum(t['external_interruptions'] for t in self.completed_tasks) + self.external_interruptions
+        """更新统计信息（直接读取增量统计，不再遍历任务）"""
+        if 'stats' not in self.built_tabs:
+            return
+        today = self.stats.rollup(stats.DAY, self.current_date)
+        week = self.stats.rollup(stats.WEEK, self.current_date)
+        month = self.stats.rollup(stats.MONTH, self.current_date)
         
-        self.internal_interruptions_label.setText(f"内部打断: {total_internal}")
-        self.external_interruptions_label.setText(f"外部打断: {total_external}")
+        self.today_label.setText(f"日期: {self.today}")
+        self.completed_tomatoes_label.setText(f"已完成番茄: {self.current_cycle}")
+        self.internal_interruptions_label.setText(f"内部打断: {today.internal}")
+        self.external_interruptions_label.setText(f"外部打断: {today.external}")
+        self.completion_ratio_label.setText(f"完成率: {today.completion_ratio:.0%}")
+        self.week_stats_label.setText(self.format_rollup("本周", week))
+        self.month_stats_label.setText(self.format_rollup("本月", month))
+    
+    def request_report(self, kind):
+        """生成本周/本月报告（排在已提交的历史写入之后，报告包含刚记录的番茄）"""
+        if self.reports is None:
+            from report import ReportService
+            self.reports = ReportService(self.history.db_file, os.path.join(self.data_dir, "reports"),
+                                         on_progress=lambda *item: self.report_progress.emit(item))
+            self.report_progress.connect(self.on_report_progress)
+            self.report_done.connect(self.on_report_done)
+        start, end = stats.period_range(kind, self.current_date)
+        self.reports_waiting.add((start, end))
+        self.report_progress_bar.setValue(0)
+        self.report_label.setText(f"{start} ~ {end}: 等待生成")
+        self.writer.submit(("report", start, end),
+                           lambda: self.reports.request(start, end).add_done_callback(self.report_done.emit))
+    
+    def invalidate_reports(self, day):
+        """历史记录变化后丢弃包含该日期的缓存报告（同样排在历史写入之后）"""
+        if self.reports is not None:
+            self.writer.submit(None, lambda: self.reports.invalidate(day))
+    
+    def on_report_progress(self, item):
+        """显示子进程回报的生成进度"""
+        (start, end), done, total, message = item
+        if (start, end) not in self.reports_waiting:
+            return  # 结果已经显示，忽略迟到的进度
+        self.report_progress_bar.setMaximum(total)
+        self.report_progress_bar.setValue(done)
+        self.report_label.setText(f"{start} ~ {end}: {message}")
+    
+    def on_report_done(self, future):
+        """报告生成完成（或命中缓存）后显示文件链接"""
+        try:
+            result = future.result()
+        except Exception as e:
+            self.report_label.setText(f"生成报告失败: {str(e)}")
+            return
+        self.reports_waiting.discard((result['start'], result['end']))
+        links = [f'<a href="{QUrl.fromLocalFile(path).toString()}">{name}</a>'
+                 for name, path in (("HTML", result['html']), ("PNG", result['png'])) if path]
+        self.report_progress_bar.setValue(self.report_progress_bar.maximum())
+        self.report_label.setText(f"{result['start']} ~ {result['end']}（{result['tomatoes']} 个番茄）: "
+                                  + " ".join(links))
+    
+    def format_rollup(self, title, rollup):
+        """将一个统计周期格式化为一行文字"""
+        return (f"{title}: {rollup.tomatoes}番茄, 内部打断 {rollup.internal}, "
+                f"外部打断 {rollup.external}, 完成率 {rollup.completion_ratio:.0%}")
+    
+    def record_interruption(self, kind):
+        """记录一次打断，在状态栏提示（不弹出模态对话框）"""
+        self.record_event(INTERRUPTION, kind=kind)
+        self.update_stats()
+        self.statusBar().showMessage(f"已记录一次{'内部' if kind == 'internal' else '外部'}打断", 3000)
     
     def record_internal_interruption(self):
         """记录内部打断"""
-        self.internal_interruptions += 1
-        self.update_stats()
-        self.save_data()
-        QMessageBox.information(self, "打断记录", "已记录一次内部打断")
+        self.record_interruption('internal')
     
     def record_external_interruption(self):
         """记录外部打断"""
-        self.external_interruptions += 1
-        self.update_stats()
-        self.save_data()
-        QMessageBox.information(self, "打断记录", "已记录一次外部打断")
+        self.record_interruption('external')
+    
+    def command_status(self):
+        """命令通道回复中的当前状态"""
+        return {'phase': self.engine.phase, 'paused': self.engine.is_paused,
+                'remaining': self.engine.display_seconds(), 'cycle': self.current_cycle,
+                'task': self.current_task if self.engine.phase != core.IDLE else "",
+                'internal': self.internal_interruptions, 'external': self.external_interruptions}
+    
+    def handle_command(self, request):
+        """处理命令通道（ipc.py）发来的请求，返回回复字典"""
+        cmd = request['cmd']
+        if cmd == 'show':
+            self.showNormal()
+            self.raise_()
+            self.activateWindow()
+        elif not self.started:
+            return {'ok': False, 'error': "正在启动，请稍后再试"}
+        elif cmd == 'start':
+            if not isinstance(request.get('task', ''), str):
+                raise ValueError("任务名必须是字符串")
+            if self.engine.phase == core.IDLE and request.get('task'):
+                self.task_input.setText(request['task'])
+            if not self.engine.is_running:
+                self.start_timer()
+        elif cmd == 'pause':
+            if self.engine.is_running:
+                self.pause_timer()
+        elif cmd == 'reset':
+            self.reset_timer()
+        elif cmd == 'add-task':
+            # 先检查参数再记录事件，不合法的请求不会改动任何状态
+            name, planned = request.get('name'), request.get('planned', 1)
+            if not isinstance(name, str) or not name:
+                raise ValueError("任务名必须是非空字符串")
+            if isinstance(planned, bool) or not isinstance(planned, int) or planned < 1:
+                raise ValueError("计划番茄数必须是至少为 1 的整数")
+            self.record_event(TASK_ADDED, name=name, planned=planned)
+        elif cmd == 'interrupt':
+            if request['kind'] not in ('internal', 'external'):
+                raise ValueError(f"未知打断类型: {request['kind']}")
+            self.record_interruption(request['kind'])
+        elif cmd != 'status':
+            raise ValueError(f"未知命令: {cmd}")
+        return dict(self.command_status(), ok=True)
 
 if __name__ == "__main__":
+    # 已有实例在运行时只把它的窗口调到前台
+    if ipc.available() and ipc.ping():
+        ipc.send_command({'cmd': 'show'})
+        sys.exit(0)
+    
     app = QApplication(sys.argv)
+    
+    # 设置 POMODORO_METRICS=1 时记录热点方法耗时、唤醒延迟和事件循环卡顿
+    metrics = None
+    if os.environ.get('POMODORO_METRICS', '') not in ('', '0'):
+        import instrumentation
+        metrics = instrumentation.setup(TomatoTimer)
+    
     timer = TomatoTimer()
+    if metrics is not None:
+        stall_monitor = instrumentation.StallMonitor(metrics, parent=timer)
+    
+    # 单实例命令通道（ipc.py 客户端通过它控制计时器）
+    command_server = None
+    if ipc.available():
+        from instance import CommandServer
+        command_server = CommandServer(timer.handle_command, parent=timer)
+        if not command_server.listen():
+            # 与同时启动的另一个实例竞争失败
+            ipc.send_command({'cmd': 'show'})
+            sys.exit(0)
+    
     timer.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    if command_server is not None:
+        command_server.close()
+    if metrics is not None:
+        for exporter in metrics.exporters:
+            exporter.close()
+    sys.exit(exit_code)
\ No newline at end of file
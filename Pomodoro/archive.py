@@ -0,0 +1,238 @@
+"""已结束日期的二进制归档：定长记录 + 任务名表，通过 mmap 零拷贝读取
+
+tomato_timer_archive.bin 由 16 字节文件头和若干 24 字节记录组成，每条记录是一个完成的番茄
+或一次打断（时间戳、日期、任务名编号、类型、阶段），按日期升序追加；任务名只在
+tomato_timer_archive.bin.names 中出现一次（每行一个 JSON 字符串，行号即编号）。
+因为记录定长且有序，按日期区间查询只需二分查找，操作系统只会读入涉及的页面。
+
+用法:
+    python archive.py --start 2024-01-01 --end 2024-12-31
+"""
+import os, sys, json, mmap, time, struct, argparse, itertools, threading
+from datetime import date
+
+import core
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"POMARC1\0"
+HEADER = struct.Struct('<8sII')  # 标识、记录长度、保留
+RECORD = struct.Struct('<dIIBB6x')  # 时间戳（未知为 NaN）、日期、任务名编号、类型、阶段
+DAY = struct.Struct('<I')
+DAY_OFFSET = 8  # 日期字段在记录中的偏移
+
+# 记录类型
+TOMATO, INTERNAL, EXTERNAL = 0, 1, 2
+KINDS = ('tomato', 'internal', 'external')
+PHASES = ('', core.WORK, core.SHORT_BREAK, core.LONG_BREAK, core.IDLE)
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([('ts', '<f8'), ('day', '<u4'), ('name', '<u4'),
+                             ('kind', 'u1'), ('phase', 'u1'), ('pad', 'V6')])
+
+
+def day_number(day):
+    """'YYYY-MM-DD' -> 1970-01-01 起的天数"""
+    return date.fromisoformat(day).toordinal() - EPOCH_ORDINAL
+
+
+def day_string(number):
+    return date.fromordinal(number + EPOCH_ORDINAL).isoformat()
+
+
+class HistoryArchive:
+    """只追加的番茄/打断归档，读取全部走 mmap
+
+    写入（append_day / catch_up）可以在后台写入线程中执行，读取可以在任意线程进行。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.names_path = path + ".names"
+        self.lock = threading.RLock()
+        self.names = []
+        self.name_codes = {}
+        if os.path.exists(self.names_path):
+            good_offset = 0
+            with open(self.names_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):  # 不完整的最后一行（写入中断）
+                        break
+                    self._intern(json.loads(line))
+                    good_offset += len(line)
+            if good_offset < os.path.getsize(self.names_path):
+                # 截断到最后一个完整的行，否则下一个名字会接在残片后面
+                with open(self.names_path, 'r+b') as f:
+                    f.truncate(good_offset)
+
+        self.file = open(path, 'a+b')
+        size = self.file.seek(0, os.SEEK_END)
+        if size < HEADER.size:
+            self.file.truncate(0)
+            self.file.write(HEADER.pack(MAGIC, RECORD.size, 0))
+            self.file.flush()
+            size = HEADER.size
+        self.file.seek(0)
+        magic, record_size, _ = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"不是有效的归档文件: {path}")
+        torn = (size - HEADER.size) % RECORD.size
+        if torn:
+            # 写入中断留下的不完整记录
+            self.file.truncate(size - torn)
+        self._remap()
+
+    def _intern(self, name):
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def _remap(self):
+        # 旧映射上可能还有 NumPy 视图，不主动关闭，由引用计数释放
+        self.file.flush()
+        size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+        self.count = (size - HEADER.size) // RECORD.size
+
+    def close(self):
+        with self.lock:
+            self.mm = None
+            self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    # ---- 写入 ----
+
+    def last_day(self):
+        """最后一条记录的日期（天数），没有记录时为 None"""
+        with self.lock:
+            if not self.count:
+                return None
+            return self._day_at(self.mm, self.count - 1)
+
+    def append_day(self, day, events):
+        """追加一天的记录，events 为 (时间戳, 任务名, 类型, 阶段) 序列，类型取 KINDS 中的值
+
+        日期不晚于已归档的最后一天时忽略（归档保持按日期有序），返回追加的记录数。
+        """
+        number = day_number(day)
+        with self.lock:
+            last = self.last_day()
+            if last is not None and number <= last:
+                return 0
+            new_names = []
+            chunks = []
+            for ts, name, kind, phase in events:
+                if name not in self.name_codes:
+                    new_names.append(name)
+                chunks.append(RECORD.pack(float('nan') if ts is None else ts, number, self._intern(name),
+                                          KINDS.index(kind), PHASES.index(phase) if phase in PHASES else 0))
+            if not chunks:
+                return 0
+            # 先写任务名表，保证记录引用的编号总是存在
+            if new_names:
+                with open(self.names_path, 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(name, ensure_ascii=False) + "\n" for name in new_names))
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.file.seek(0, os.SEEK_END)
+            self.file.write(b"".join(chunks))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self._remap()
+            return len(chunks)
+
+    def catch_up(self, history, before):
+        """把历史库中最后归档日之后、before（不含）之前的所有日期追加到归档，返回追加的天数"""
+        with self.lock:
+            last = self.last_day()
+            after = day_string(last) if last is not None else None
+            days = 0
+            rows = history.events_between(after, before)
+            for day, group in itertools.groupby(rows, key=lambda row: row[0]):
+                if self.append_day(day, (row[1:] for row in group)):
+                    days += 1
+            return days
+
+    # ---- 读取 ----
+
+    @staticmethod
+    def _day_at(mm, index):
+        return DAY.unpack_from(mm, HEADER.size + index * RECORD.size + DAY_OFFSET)[0]
+
+    def _bisect(self, mm, count, number):
+        # 第一条日期 >= number 的记录，只读取二分路径上的页面
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._day_at(mm, mid) < number:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _range(self, start, end):
+        """日期区间（含两端）对应的 (映射, 起始下标, 结束下标)"""
+        with self.lock:
+            mm, count = self.mm, self.count
+        lo = self._bisect(mm, count, day_number(start)) if start else 0
+        hi = self._bisect(mm, count, day_number(end) + 1) if end else count
+        return mm, lo, max(lo, hi)
+
+    def records(self, start=None, end=None):
+        """逐条产出 (时间戳, 日期, 任务名, 类型, 阶段)，时间戳未知时为 None"""
+        mm, lo, hi = self._range(start, end)
+        view = memoryview(mm)[HEADER.size + lo * RECORD.size:HEADER.size + hi * RECORD.size]
+        try:
+            for ts, number, name, kind, phase in RECORD.iter_unpack(view):
+                yield (None if ts != ts else ts, day_string(number), self.names[name], KINDS[kind], PHASES[phase])
+        finally:
+            view.release()
+
+    def view(self, start=None, end=None):
+        """日期区间内记录的 NumPy 结构化数组，直接指向映射内存（只读，不复制）"""
+        if np is None:
+            raise RuntimeError("view() 需要安装 numpy")
+        mm, lo, hi = self._range(start, end)
+        return np.frombuffer(mm, dtype=RECORD_DTYPE, count=hi - lo, offset=HEADER.size + lo * RECORD.size)
+
+    def totals(self, start=None, end=None):
+        """日期区间内的 (番茄数, 内部打断, 外部打断)"""
+        if np is not None:
+            counts = np.bincount(self.view(start, end)['kind'], minlength=len(KINDS))
+            return int(counts[TOMATO]), int(counts[INTERNAL]), int(counts[EXTERNAL])
+        counts = [0] * len(KINDS)
+        for record in self.records(start, end):
+            counts[KINDS.index(record[3])] += 1
+        return tuple(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询番茄钟二进制归档")
+    parser.add_argument('--archive', default="tomato_timer_archive.bin")
+    parser.add_argument('--start', help="起始日期 YYYY-MM-DD（含）")
+    parser.add_argument('--end', help="结束日期 YYYY-MM-DD（含）")
+    args = parser.parse_args()
+
+    archive = HistoryArchive(args.archive)
+    try:
+        t = time.perf_counter()
+        tomatoes, internal, external = archive.totals(args.start, args.end)
+        seconds = time.perf_counter() - t
+    finally:
+        archive.close()
+    print(f"番茄 {tomatoes}，内部打断 {internal}，外部打断 {external}（共 {len(archive)} 条记录，"
+          f"查询 {seconds * 1000:.2f} ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
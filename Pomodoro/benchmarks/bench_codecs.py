@@ -0,0 +1,53 @@
+"""快照编解码器基准：各编解码器的编码/解码耗时和文件大小
+
+对每个任务数生成合成快照，用 serializers 中所有可用的编解码器（未安装 orjson 时跳过）
+分别编码、解码若干次，报告耗时中位数和编码后的字节数。
+
+用法:
+    python benchmarks/bench_codecs.py --sizes 1000 10000 100000 --json codecs.json
+"""
+import sys, os, json, time, argparse, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serializers
+from synthetic import make_snapshot
+
+
+def median_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="任务数")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        data = make_snapshot(size)
+        for name, codec in serializers.CODECS.items():
+            raw = codec.encode(data)
+            assert serializers.decode(raw) == data
+            encode_ms = median_ms(lambda: codec.encode(data), args.repeat)
+            decode_ms = median_ms(lambda: codec.decode(raw), args.repeat)
+            results.append({'codec': name, 'size': size, 'encode_ms': encode_ms,
+                            'decode_ms': decode_ms, 'bytes': len(raw)})
+            print(f"{size:>8} {name:<13} 编码 {encode_ms:9.2f} ms  解码 {decode_ms:9.2f} ms  大小 {len(raw) / 1024:10.1f} KB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'codecs': list(serializers.CODECS),
+                       'results': results}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
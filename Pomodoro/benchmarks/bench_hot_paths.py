@@ -0,0 +1,126 @@
+"""热点路径基准：测量主要操作的耗时和峰值内存随数据规模的变化
+
+在 offscreen 平台下运行，不需要显示器。对每个规模生成合成数据，在临时目录中
+启动 TomatoTimer，然后分别测量 load_data、save_data、update_tasks_list、
+update_stats、add_task、mark_task_completed。结果可写入 JSON，便于比较不同版本。
+
+用法:
+    python benchmarks/bench_hot_paths.py --sizes 10 1000 100000 --json hot_paths.json --label v1
+"""
+import sys, os, json, time, argparse, tempfile, statistics, tracemalloc, subprocess
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from synthetic import write_data
+
+POMODORO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def measure(func, repeat):
+    """返回 (耗时中位数 ms, 最小耗时 ms, 单次调用峰值内存 KB)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), min(times), peak / 1024
+
+
+def bench_size(pomodoro, size, repeat):
+    """在临时目录中针对一个数据规模测量所有操作"""
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.chdir(data_dir)
+        try:
+            write_data(data_dir, size)
+            window = pomodoro.TomatoTimer()
+            window.finish_startup()
+            for index in range(window.right_panel.count()):
+                window.right_panel.setCurrentIndex(index)  # 创建所有标签页
+
+            counter = iter(range(10 ** 9))
+
+            def add_task():
+                window.task_input.setText(f"新任务{next(counter)}")
+                window.add_task()
+
+            def mark_task_completed():
+                # 总是计入仍在未完成列表中的第一个任务
+                window.current_task = window.daily_tasks[0].name if window.daily_tasks else ""
+                window.mark_task_completed()
+
+            def save_data_flushed():
+                window.save_data()
+                window.writer.flush()
+
+            operations = [
+                ('load_data', window.load_data),
+                ('save_data', window.save_data),
+                ('save_data+flush', save_data_flushed),
+                ('update_tasks_list', window.update_tasks_list),
+                ('update_stats', window.update_stats),
+                ('add_task', add_task),
+                ('mark_task_completed', mark_task_completed),
+            ]
+            for name, func in operations:
+                median_ms, min_ms, peak_kb = measure(func, repeat)
+                results.append({'operation': name, 'size': size, 'median_ms': median_ms,
+                                'min_ms': min_ms, 'peak_kb': peak_kb})
+                print(f"{size:>8} {name:<22} 中位数 {median_ms:10.3f} ms  最小 {min_ms:10.3f} ms  峰值内存 {peak_kb:10.1f} KB")
+            window.close()
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=POMODORO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="任务数量规模")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="每个操作重复次数")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    parser.add_argument('--label', help="结果标签（例如版本号）")
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    from PyQt5.QtCore import QT_VERSION_STR
+    qt_app = QApplication(sys.argv[:1])
+    # 基准中不弹出模态对话框
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.Ok)
+    sys.path.insert(0, POMODORO_DIR)
+    import app as pomodoro
+
+    results = []
+    for size in args.sizes:
+        results.extend(bench_size(pomodoro, size, args.repeat))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'label': args.label,
+                'revision': git_revision(),
+                'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'python': sys.version.split()[0],
+                'qt': QT_VERSION_STR,
+                'repeat': args.repeat,
+                'results': results,
+            }, f, indent=4, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""任务记录内存基准：字典、TaskRecord（__slots__）和 TaskArray（按列数组）的对比
+
+对每种表示构造 count 条记录（任务名从固定的名称池中取，与历史数据中任务名大量重复的
+情况一致），用 tracemalloc 测量构造后常驻的内存，并报告每条记录的字节数。
+
+用法:
+    python benchmarks/bench_memory.py --count 1000000 --json memory.json
+"""
+import sys, os, gc, json, time, argparse, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import TaskRecord, TaskArray
+
+
+def make_rows(count, name_pool):
+    names = [f"任务{i}" for i in range(name_pool)]
+    for i in range(count):
+        yield names[i % name_pool], 4, i % 5, i % 3, i % 2
+
+
+def build_dicts(rows):
+    return [{'name': name, 'planned': planned, 'completed': completed,
+             'internal_interruptions': internal, 'external_interruptions': external}
+            for name, planned, completed, internal, external in rows]
+
+
+def build_records(rows):
+    return [TaskRecord(*row) for row in rows]
+
+
+def build_array(rows):
+    tasks = TaskArray()
+    for row in rows:
+        tasks.append_row(*row)
+    return tasks
+
+
+def measure(build, count, name_pool):
+    """返回 (常驻内存 MB, 构造耗时 s)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(make_rows(count, name_pool))
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024 / 1024, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, nargs='+', default=[1000000], help="记录数")
+    parser.add_argument('--names', type=int, default=1000, help="不同任务名的数量")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.count:
+        baseline = None
+        for kind, build in (('dict', build_dicts), ('TaskRecord', build_records), ('TaskArray', build_array)):
+            mb, seconds = measure(build, count, args.names)
+            baseline = baseline or mb
+            results.append({'kind': kind, 'count': count, 'memory_mb': mb,
+                            'bytes_per_record': mb * 1024 * 1024 / count, 'build_seconds': seconds})
+            print(f"{count:>9} {kind:<11} {mb:9.1f} MB  每条 {mb * 1024 * 1024 / count:6.1f} 字节  "
+                  f"为字典的 {mb / baseline:5.1%}  构造 {seconds:.2f} s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""团队服务器压测：大量并发会话共用一个时间轮时的调度开销与切换延迟
+
+在进程内启动 TimerServer，按给定数量创建会话（阶段时长缩短到秒级，使压测期间
+发生大量阶段切换），可选地连接若干客户端订阅部分会话，运行指定秒数后报告：
+阶段切换数、切换延迟分位数、每个刻度的最大处理时间、客户端收到的推送数和内存峰值。
+
+用法:
+    python benchmarks/bench_server.py --sessions 1000 10000 50000 --seconds 10 --clients 20 --json server.json
+"""
+import sys, os, json, time, random, asyncio, argparse, statistics, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import TimerServer
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_clients(port, session_names, received, stop):
+    """每个客户端订阅一部分会话，统计收到的推送"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for name in session_names:
+        writer.write((json.dumps({'cmd': 'subscribe', 'session': name}) + "\n").encode())
+    await writer.drain()
+    while not stop.is_set():
+        try:
+            line = await asyncio.wait_for(reader.readline(), 0.5)
+        except asyncio.TimeoutError:
+            continue
+        if not line:
+            break
+        if b'"event"' in line:
+            received[0] += 1
+    writer.close()
+
+
+async def run_load(session_count, seconds, client_count, tick):
+    server = TimerServer(tick=tick, loop=asyncio.get_running_loop())
+    server.record_lateness = True
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    rng = random.Random(0)
+    for i in range(session_count):
+        # 工作 2~6 秒，休息 1~3 秒，让每个会话在压测期间多次切换
+        session = server.create_session(f"s{i}", work_duration=rng.uniform(2, 6) / 60,
+                                        short_break_duration=rng.uniform(1, 3) / 60,
+                                        long_break_duration=rng.uniform(1, 3) / 60,
+                                        long_break_interval=4)
+        server.start(session)
+    schedule_seconds = time.perf_counter() - start
+
+    # 记录每次推进时间轮的耗时
+    tick_costs = []
+    advance = server.wheel.advance
+
+    def timed_advance(now):
+        t = time.perf_counter()
+        fired = advance(now)
+        tick_costs.append(time.perf_counter() - t)
+        return fired
+    server.wheel.advance = timed_advance
+
+    tcp = await asyncio.start_server(server.handle_client, '127.0.0.1', 0)
+    port = tcp.sockets[0].getsockname()[1]
+    server.start_driver()
+
+    received = [0]
+    stop = asyncio.Event()
+    names = list(server.sessions)
+    clients = [asyncio.create_task(run_clients(port, names[i::max(1, client_count)][:100], received, stop))
+               for i in range(client_count)]
+
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*clients)
+    server.stop_driver()
+    tcp.close()
+    await tcp.wait_closed()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lateness_ms = [v * 1000 for v in server.lateness]
+    return {
+        'sessions': session_count,
+        'seconds': seconds,
+        'tick': tick,
+        'clients': client_count,
+        'schedule_ms': schedule_seconds * 1000,
+        'transitions': server.transitions,
+        'transitions_per_second': server.transitions / seconds,
+        'lateness_p50_ms': percentile(lateness_ms, 0.5),
+        'lateness_p99_ms': percentile(lateness_ms, 0.99),
+        'lateness_max_ms': max(lateness_ms, default=0.0),
+        'tick_cost_median_ms': statistics.median(tick_costs) * 1000 if tick_costs else 0.0,
+        'tick_cost_max_ms': max(tick_costs, default=0.0) * 1000,
+        'pushes_received': received[0],
+        'peak_memory_mb': peak / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1000, 10000, 50000], help="并发会话数")
+    parser.add_argument('--seconds', type=float, default=10, help="每个规模运行的秒数")
+    parser.add_argument('--clients', type=int, default=10, help="订阅客户端数（每个最多订阅 100 个会话）")
+    parser.add_argument('--tick', type=float, default=0.1, help="时间轮刻度（秒）")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.sessions:
+        result = asyncio.run(run_load(count, args.seconds, args.clients, args.tick))
+        results.append(result)
+        print(f"{count:>7} 个会话: 切换 {result['transitions']:>8} 次 ({result['transitions_per_second']:.0f}/s), "
+              f"延迟 p50 {result['lateness_p50_ms']:.1f} ms / p99 {result['lateness_p99_ms']:.1f} ms, "
+              f"刻度耗时中位数 {result['tick_cost_median_ms']:.2f} ms / 最大 {result['tick_cost_max_ms']:.2f} ms, "
+              f"推送 {result['pushes_received']}, 内存峰值 {result['peak_memory_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""冷启动基准：测量从进程启动到计时器第一次绘制、以及数据加载完成的时间
+
+每次测量都在新进程中以 offscreen 平台启动 TomatoTimer，工作目录为临时目录，
+可用 --tasks 预先生成指定数量任务的数据文件。
+
+用法:
+    python benchmarks/bench_startup.py -n 10 --tasks 1000 --json startup.json --max-first-paint-ms 500
+"""
+import sys, os, json, time, argparse, subprocess, tempfile, statistics
+
+from synthetic import write_data
+
+POMODORO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child():
+    """子进程：启动窗口并记录各阶段耗时（毫秒，相对于进入本函数）"""
+    t0 = time.perf_counter()
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+    qt_app = QApplication(sys.argv[:1])
+    sys.path.insert(0, POMODORO_DIR)
+    import app as pomodoro
+    result = {'import_ms': (time.perf_counter() - t0) * 1000}
+
+    class PaintProbe(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and 'first_paint_ms' not in result:
+                result['first_paint_ms'] = (time.perf_counter() - t0) * 1000
+            return False
+
+    def on_ready():
+        result['ready_ms'] = (time.perf_counter() - t0) * 1000
+        QTimer.singleShot(0, qt_app.quit)
+
+    window = pomodoro.TomatoTimer()
+    result['construct_ms'] = (time.perf_counter() - t0) * 1000
+    probe = PaintProbe()
+    window.timer_display.installEventFilter(probe)
+    window.startup_finished.connect(on_ready)
+    window.show()
+    qt_app.exec_()
+    window.close()
+    print(json.dumps(result))
+
+
+def run_once(data_dir):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'],
+                         cwd=data_dir, env=env, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['process_wall_ms'] = wall_ms
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--runs', type=int, default=5, help="测量次数")
+    parser.add_argument('--tasks', type=int, default=0, help="预先生成的任务数")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    parser.add_argument('--max-first-paint-ms', type=float,
+                        help="首次绘制中位数超过该值时以非零状态退出（用于发现回归）")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return 0
+
+    runs = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            if args.tasks:
+                write_data(data_dir, args.tasks)
+            runs.append(run_once(data_dir))
+
+    summary = {}
+    for key in ('import_ms', 'construct_ms', 'first_paint_ms', 'ready_ms', 'process_wall_ms'):
+        values = [r[key] for r in runs if key in r]
+        if values:
+            summary[key] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+            print(f"{key:>16}: 中位数 {summary[key]['median']:8.1f}  最小 {summary[key]['min']:8.1f}  最大 {summary[key]['max']:8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'runs': args.runs, 'tasks': args.tasks, 'python': sys.version.split()[0],
+                       'summary': summary, 'samples': runs}, f, indent=4)
+
+    if args.max_first_paint_ms is not None and summary['first_paint_ms']['median'] > args.max_first_paint_ms:
+        print(f"首次绘制中位数超过 {args.max_first_paint_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
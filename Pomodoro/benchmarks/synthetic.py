@@ -0,0 +1,29 @@
+"""基准测试共用的合成数据"""
+import os, json, time
+
+
+def make_tasks(count, prefix="任务"):
+    """生成 count 个任务字典，完成数和打断数按序号循环"""
+    return [{'name': f"{prefix}{i}", 'planned': 4, 'completed': i % 5,
+             'internal_interruptions': i % 3, 'external_interruptions': i % 2} for i in range(count)]
+
+
+def make_snapshot(count):
+    """生成包含 count 个任务的快照数据（tomato_timer_data.json 格式）"""
+    tasks = make_tasks(count)
+    return {
+        'date': time.strftime("%Y-%m-%d"),
+        'settings': {'work_duration': 25, 'short_break_duration': 5,
+                     'long_break_duration': 15, 'long_break_interval': 4},
+        'stats': {'completed_tomatoes': sum(t['completed'] for t in tasks),
+                  'internal_interruptions': 0, 'external_interruptions': 0},
+        'pending_interruptions': {'internal': 0, 'external': 0},
+        'daily_tasks': [t for t in tasks if t['completed'] < t['planned']],
+        'completed_tasks': [t for t in tasks if t['completed'] >= t['planned']],
+    }
+
+
+def write_data(data_dir, count):
+    """在数据目录中写入包含 count 个任务的快照文件"""
+    with open(os.path.join(data_dir, "tomato_timer_data.json"), 'w') as f:
+        json.dump(make_snapshot(count), f, indent=4)
@@ -0,0 +1,193 @@
+import time, math
+
+BOOTTIME = hasattr(time, 'CLOCK_BOOTTIME')
+
+# 阶段
+IDLE = "idle"
+WORK = "work"
+SHORT_BREAK = "short_break"
+LONG_BREAK = "long_break"
+
+# 引擎事件
+STATE_CHANGED = "state_changed"  # 开始/暂停/继续/重置
+PHASE_CHANGED = "phase_changed"  # 工作与休息之间切换
+TOMATO_COMPLETED = "tomato_completed"  # 一个工作阶段结束
+
+
+class MonotonicClock:
+    """真实时钟
+
+    Linux 上使用 CLOCK_BOOTTIME：与 time.monotonic() 一样不受系统时间调整影响，
+    但系统挂起期间也继续计时，恢复后阶段按真实经过的时间结束。其他平台使用 time.monotonic()。
+    """
+
+    def now(self):
+        return time.clock_gettime(time.CLOCK_BOOTTIME) if BOOTTIME else time.monotonic()
+
+
+class VirtualClock:
+    """可手动拨动的虚拟时钟，用于测试和高速模拟"""
+
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        """向前拨动时钟"""
+        self.current += seconds
+
+    def set(self, value):
+        """将时钟设置到指定时间点"""
+        self.current = value
+
+
+class SessionEngine:
+    """不依赖 Qt 的番茄工作法状态机
+
+    计时由单调时钟上的截止时间决定，引擎本身不产生定时器：调用方在
+    next_wakeup() 返回的时间后调用 advance() 即可。状态变化通过 subscribe()
+    注册的回调 listener(event, engine) 通知。
+    """
+
+    def __init__(self, clock=None, work_duration=25, short_break_duration=5,
+                 long_break_duration=15, long_break_interval=4):
+        self.clock = clock or MonotonicClock()
+        self.work_duration = work_duration  # 工作时间（分钟）
+        self.short_break_duration = short_break_duration  # 短休息时间（分钟）
+        self.long_break_duration = long_break_duration  # 长休息时间（分钟）
+        self.long_break_interval = long_break_interval  # 长休息间隔（几个番茄后）
+        self.current_cycle = 0  # 已完成的番茄数
+        self.phase = IDLE
+        self.is_paused = False
+        self.deadline = None  # 当前阶段结束的时钟时间（运行中才有）
+        self.paused_left = None  # 暂停时剩余的精确秒数
+        self.listeners = []
+
+    @property
+    def is_working(self):
+        return self.phase == WORK
+
+    @property
+    def is_running(self):
+        return self.deadline is not None
+
+    def subscribe(self, listener):
+        """注册状态变化回调 listener(event, engine)"""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def emit(self, event):
+        for listener in list(self.listeners):
+            listener(event, self)
+
+    def phase_seconds(self, phase):
+        """某阶段的总时长（秒）"""
+        if phase == SHORT_BREAK:
+            return self.short_break_duration * 60
+        if phase == LONG_BREAK:
+            return self.long_break_duration * 60
+        return self.work_duration * 60
+
+    def seconds_left(self):
+        """当前阶段剩余的精确秒数"""
+        if self.deadline is not None:
+            return max(0.0, self.deadline - self.clock.now())
+        if self.paused_left is not None:
+            return self.paused_left
+        return float(self.phase_seconds(self.phase))
+
+    def display_seconds(self):
+        """用于显示的剩余整秒数"""
+        return math.ceil(self.seconds_left())
+
+    def next_wakeup(self):
+        """距离显示的秒数下一次变化（或阶段结束）的秒数，未运行时返回 None"""
+        if self.deadline is None:
+            return None
+        left = self.deadline - self.clock.now()
+        if left <= 0:
+            return 0.0
+        return left - (math.ceil(left) - 1)
+
+    def start(self):
+        """开始一个新的工作阶段，或从暂停中恢复"""
+        if self.is_paused:
+            self.is_paused = False
+            self.deadline = self.clock.now() + self.paused_left
+            self.paused_left = None
+            self.emit(STATE_CHANGED)
+        elif self.phase == IDLE:
+            self.phase = WORK
+            self.deadline = self.clock.now() + self.phase_seconds(WORK)
+            self.emit(STATE_CHANGED)
+            self.emit(PHASE_CHANGED)
+
+    def pause(self):
+        """暂停当前阶段"""
+        if self.deadline is None:
+            return
+        self.paused_left = self.seconds_left()
+        self.deadline = None
+        self.is_paused = True
+        self.emit(STATE_CHANGED)
+
+    def reset(self):
+        """回到未开始状态（已完成的番茄数保留）"""
+        self.phase = IDLE
+        self.is_paused = False
+        self.deadline = None
+        self.paused_left = None
+        self.emit(STATE_CHANGED)
+
+    def update_settings(self, work_duration, short_break_duration,
+                        long_break_duration, long_break_interval):
+        """更新时长设置；工作阶段中按比例调整剩余时间"""
+        time_ratio = 1
+        if self.is_working and self.work_duration > 0:
+            time_ratio = work_duration / self.work_duration
+        left = self.seconds_left() * time_ratio
+
+        self.work_duration = work_duration
+        self.short_break_duration = short_break_duration
+        self.long_break_duration = long_break_duration
+        self.long_break_interval = long_break_interval
+
+        if self.is_working:
+            if self.deadline is not None:
+                self.deadline = self.clock.now() + left
+            else:
+                self.paused_left = left
+        self.emit(STATE_CHANGED)
+
+    def advance(self):
+        """处理截止时间已过的所有阶段切换，返回切换次数"""
+        transitions = 0
+        while self.deadline is not None and self.deadline <= self.clock.now():
+            if self.phase == WORK:
+                # 工作时间结束，开始休息
+                self.current_cycle += 1
+                self.emit(TOMATO_COMPLETED)
+                # 检查是否需要长休息
+                if self.current_cycle % self.long_break_interval == 0:
+                    self.phase = LONG_BREAK
+                else:
+                    self.phase = SHORT_BREAK
+            else:
+                # 休息时间结束，开始工作
+                self.phase = WORK
+            # 新阶段从上一阶段的截止时间接续，不累积误差
+            self.deadline += self.phase_seconds(self.phase)
+            transitions += 1
+            self.emit(PHASE_CHANGED)
+        return transitions
+
+    def run_until(self, until):
+        """配合 VirtualClock 将模拟推进到指定时间点"""
+        while self.deadline is not None and self.deadline <= until:
+            self.clock.set(self.deadline)
+            self.advance()
+        self.clock.set(until)
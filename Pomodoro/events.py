@@ -0,0 +1,210 @@
+"""会话事件总线与插件
+
+界面线程在会话开始、阶段切换、番茄完成、记录打断、跨天时发布类型化事件，
+订阅者在后台工作线程中异步执行。每个订阅者有自己的有界队列，队列满时按策略丢弃事件
+（默认丢弃最旧的），publish() 从不阻塞，因此慢插件不会拖慢计时器。
+同一订阅者的事件按发布顺序逐个处理，不同订阅者之间并行。
+
+插件是带有 register(bus) 函数的模块，用环境变量 POMODORO_PLUGINS 指定（逗号分隔）:
+    POMODORO_PLUGINS=my_sound,my_webhook python app.py
+
+    # my_sound.py
+    import events
+    def register(bus):
+        bus.subscribe(lambda e: play(), events.TomatoCompleted, name="sound")
+"""
+import time, logging, importlib, threading
+from collections import deque
+from dataclasses import dataclass, field
+
+log = logging.getLogger(__name__)
+
+# 队列满时的处理策略
+DROP_OLDEST = "drop_oldest"  # 丢弃最早的未处理事件（订阅者总能看到最新状态）
+DROP_NEWEST = "drop_newest"  # 丢弃新发布的事件
+
+
+@dataclass(frozen=True, slots=True)
+class SessionStarted:
+    """从未开始状态开始一个新的工作阶段"""
+    task: str
+    day: str
+    ts: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True, slots=True)
+class PhaseChanged:
+    """阶段切换（包括重置回未开始）"""
+    previous: str
+    phase: str
+    cycle: int
+    ts: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True, slots=True)
+class TomatoCompleted:
+    """完成一个番茄，cycle 为今天的第几个"""
+    task: str
+    cycle: int
+    day: str
+    ts: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True, slots=True)
+class InterruptionRecorded:
+    """记录一次打断，kind 为 'internal' / 'external'"""
+    kind: str
+    task: str
+    phase: str
+    day: str
+    ts: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True, slots=True)
+class DayRolledOver:
+    """跨天，前一天的数据已经保存"""
+    previous_day: str
+    day: str
+    ts: float = field(default_factory=time.time)
+
+
+EVENT_TYPES = (SessionStarted, PhaseChanged, TomatoCompleted, InterruptionRecorded, DayRolledOver)
+
+
+class Subscription:
+    """一个订阅者：处理函数、有界队列与计数"""
+
+    __slots__ = ('handler', 'event_types', 'name', 'queue_size', 'policy', 'queue', 'scheduled',
+                 'active', 'delivered', 'dropped', 'errors')
+
+    def __init__(self, handler, event_types, name, queue_size, policy):
+        self.handler = handler
+        self.event_types = event_types
+        self.name = name
+        self.queue_size = queue_size
+        self.policy = policy
+        self.queue = deque()
+        self.scheduled = False  # 是否已在就绪队列中或正在处理
+        self.active = True
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+
+class EventBus:
+    """在工作线程池中异步分发事件
+
+    subscribe() 返回 Subscription，可用于 unsubscribe() 和查看计数。
+    处理函数抛出的异常只计数并交给 on_error(subscription, event, 异常)，不影响其他订阅者。
+    """
+
+    def __init__(self, workers=2, queue_size=256, on_error=None):
+        self.queue_size = queue_size  # 每个订阅者的默认队列长度
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._ready = deque()  # 有待处理事件的订阅者，轮流处理
+        self._subscribers = {}  # 事件类型 -> [Subscription]
+        self._busy = 0  # 正在执行的处理函数数
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._run, name=f"event-bus-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def subscribe(self, handler, *event_types, name=None, queue_size=None, policy=DROP_OLDEST):
+        """订阅指定类型的事件（不指定类型时订阅全部）"""
+        event_types = event_types or EVENT_TYPES
+        subscription = Subscription(handler, event_types, name or getattr(handler, '__name__', repr(handler)),
+                                    queue_size or self.queue_size, policy)
+        with self._cond:
+            for event_type in event_types:
+                # 复制后替换，publish() 遍历时不受影响
+                self._subscribers[event_type] = self._subscribers.get(event_type, []) + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """取消订阅，丢弃尚未处理的事件"""
+        with self._cond:
+            subscription.active = False
+            subscription.queue.clear()
+            for event_type in subscription.event_types:
+                self._subscribers[event_type] = [s for s in self._subscribers.get(event_type, [])
+                                                 if s is not subscription]
+
+    def publish(self, event):
+        """发布事件（只入队，不等待订阅者）"""
+        with self._cond:
+            if self._stopping:
+                return
+            for subscription in self._subscribers.get(type(event), ()):
+                if len(subscription.queue) >= subscription.queue_size:
+                    subscription.dropped += 1
+                    if subscription.policy == DROP_NEWEST:
+                        continue
+                    subscription.queue.popleft()
+                subscription.queue.append(event)
+                if not subscription.scheduled:
+                    subscription.scheduled = True
+                    self._ready.append(subscription)
+                    self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                subscription = self._ready.popleft()
+                if not subscription.queue:
+                    subscription.scheduled = False
+                    continue
+                event = subscription.queue.popleft()
+                self._busy += 1
+            try:
+                subscription.handler(event)
+            except Exception as e:
+                subscription.errors += 1
+                if self.on_error is not None:
+                    self.on_error(subscription, event, e)
+                else:
+                    log.exception("事件处理失败: %s", subscription.name)
+            with self._cond:
+                subscription.delivered += 1
+                self._busy -= 1
+                # 每次只处理一个事件，之后排到队尾，慢订阅者不会独占工作线程
+                if subscription.queue and subscription.active:
+                    self._ready.append(subscription)
+                else:
+                    subscription.scheduled = False
+                self._cond.notify_all()
+
+    def stats(self):
+        """各订阅者的 (名称, 已处理, 已丢弃, 出错, 待处理)"""
+        with self._cond:
+            subscriptions = {id(s): s for subs in self._subscribers.values() for s in subs}.values()
+            return [(s.name, s.delivered, s.dropped, s.errors, len(s.queue)) for s in subscriptions]
+
+    def close(self, timeout=1.0):
+        """处理完已入队的事件后结束工作线程（最多等待 timeout 秒，慢插件不阻塞退出）"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._ready or self._busy) and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            self._stopping = True
+            self._ready.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+
+def load_plugins(bus, spec):
+    """导入逗号分隔的插件模块并调用其 register(bus)，返回 (已加载, [(模块名, 异常)])"""
+    loaded, failed = [], []
+    for module_name in filter(None, (s.strip() for s in spec.split(','))):
+        try:
+            importlib.import_module(module_name).register(bus)
+            loaded.append(module_name)
+        except Exception as e:
+            failed.append((module_name, e))
+    return loaded, failed
@@ -0,0 +1,195 @@
+"""历史记录的流式导入导出（JSONL / CSV）
+
+导出时逐行读取 SQLite 游标并立即写出，导入时逐行解析并分批写入，
+内存占用与历史大小无关。每条记录带 record 字段区分 task / tomato / interruption。
+
+用法:
+    python export.py export --db tomato_timer_history.db --format csv --start 2024-01-01 --end 2024-12-31 -o 2024.csv
+    python export.py import --db tomato_timer_history.db 2024.jsonl
+"""
+import sys, csv, json, sqlite3, argparse, itertools
+
+from history import HistoryStore
+
+RECORD_TYPES = ('task', 'tomato', 'interruption')
+
+# CSV 列（各类记录共用，不适用的列留空）
+FIELDS = ('record', 'date', 'ts', 'task', 'planned', 'completed',
+          'internal_interruptions', 'external_interruptions', 'phase', 'kind')
+INT_FIELDS = ('planned', 'completed', 'internal_interruptions', 'external_interruptions')
+
+QUERIES = {
+    'task': ("SELECT date, name, planned, completed, internal_interruptions, external_interruptions "
+             "FROM tasks WHERE date BETWEEN ? AND ? ORDER BY date, id",
+             lambda r: {'record': 'task', 'date': r[0], 'task': r[1], 'planned': r[2], 'completed': r[3],
+                        'internal_interruptions': r[4], 'external_interruptions': r[5]}),
+    'tomato': ("SELECT date, ts, task, phase FROM tomatoes WHERE date BETWEEN ? AND ? ORDER BY date, id",
+               lambda r: {'record': 'tomato', 'date': r[0], 'ts': r[1], 'task': r[2], 'phase': r[3]}),
+    'interruption': ("SELECT date, ts, task, kind, phase FROM interruptions WHERE date BETWEEN ? AND ? ORDER BY date, id",
+                     lambda r: {'record': 'interruption', 'date': r[0], 'ts': r[1], 'task': r[2],
+                                'kind': r[3], 'phase': r[4]}),
+}
+
+
+def iter_records(db_file, start=None, end=None, kinds=RECORD_TYPES):
+    """按类型依次逐行产出日期区间内的记录
+
+    使用独立的只读连接，WAL 模式下不会阻塞正在运行的计时器写入。
+    """
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        for kind in kinds:
+            sql, to_record = QUERIES[kind]
+            for row in conn.execute(sql, (start or '0000-00-00', end or '9999-99-99')):
+                yield to_record(row)
+    finally:
+        conn.close()
+
+
+def write_jsonl(records, fp):
+    """逐条写出 JSONL，返回条数"""
+    count = 0
+    for record in records:
+        fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_csv(records, fp):
+    """逐条写出 CSV，返回条数"""
+    writer = csv.DictWriter(fp, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def read_jsonl(fp):
+    """逐行解析 JSONL"""
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(fp):
+    """逐行解析 CSV，并把数字列还原为数字"""
+    for row in csv.DictReader(fp):
+        record = {k: v for k, v in row.items() if v != ''}
+        for key in INT_FIELDS:
+            if key in record:
+                record[key] = int(record[key])
+        if 'ts' in record:
+            record['ts'] = float(record['ts'])
+        yield record
+
+
+# 番茄和打断没有唯一键：导入时先写入临时表，最后每组相同的记录只补上库中缺少的条数。
+# 重复导入同一份文件不会重复计数，同一组中的多条记录（如旧 JSON 导入的无时间戳番茄）也按条数保留。
+EVENT_TABLES = {
+    'tomato': ('tomatoes', ('ts', 'date', 'task', 'phase')),
+    'interruption': ('interruptions', ('ts', 'date', 'task', 'kind', 'phase')),
+}
+
+
+def _merge_events(conn, table, columns):
+    cols = ", ".join(columns)
+    match = " AND ".join(f"e.{c} IS x.{c}" for c in columns)
+    conn.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM ("
+                 f"SELECT {cols}, ROW_NUMBER() OVER (PARTITION BY {cols}) AS n FROM temp.import_{table}) AS x "
+                 f"WHERE x.n > (SELECT COUNT(*) FROM {table} AS e WHERE {match})")
+
+
+def import_records(store, records, batch_size=1000):
+    """把记录分批写入 HistoryStore，返回导入条数（重复导入同一份数据结果不变）"""
+    with store.lock:
+        for table, columns in EVENT_TABLES.values():
+            store.conn.execute(f"DROP TABLE IF EXISTS temp.import_{table}")
+            store.conn.execute(f"CREATE TEMP TABLE import_{table} ({', '.join(columns)})")
+    try:
+        count = _import_batches(store, records, batch_size)
+        with store.lock, store.conn:
+            for table, columns in EVENT_TABLES.values():
+                _merge_events(store.conn, table, columns)
+        return count
+    finally:
+        with store.lock:
+            for table, _ in EVENT_TABLES.values():
+                store.conn.execute(f"DROP TABLE IF EXISTS temp.import_{table}")
+
+
+def _import_batches(store, records, batch_size):
+    count = 0
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return count
+        with store.lock, store.conn:
+            for record in batch:
+                kind = record['record']
+                if kind == 'task':
+                    store.conn.execute(
+                        "INSERT INTO tasks (date, name, planned, completed, internal_interruptions, external_interruptions) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (date, name) DO UPDATE SET planned = excluded.planned, completed = excluded.completed, "
+                        "internal_interruptions = excluded.internal_interruptions, "
+                        "external_interruptions = excluded.external_interruptions",
+                        (record['date'], record['task'], record.get('planned', 0), record.get('completed', 0),
+                         record.get('internal_interruptions', 0), record.get('external_interruptions', 0)))
+                elif kind == 'tomato':
+                    store.conn.execute("INSERT INTO temp.import_tomatoes (ts, date, task, phase) VALUES (?, ?, ?, ?)",
+                                       (record.get('ts'), record['date'], record.get('task', ''),
+                                        record.get('phase', 'work')))
+                elif kind == 'interruption':
+                    store.conn.execute("INSERT INTO temp.import_interruptions (ts, date, task, kind, phase) "
+                                       "VALUES (?, ?, ?, ?, ?)",
+                                       (record.get('ts'), record['date'], record.get('task', ''),
+                                        record['kind'], record.get('phase', '')))
+                else:
+                    raise ValueError(f"未知记录类型: {kind}")
+        count += len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史记录的流式导入导出")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('export', help="导出为 JSONL 或 CSV")
+    p.add_argument('--db', default="tomato_timer_history.db")
+    p.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    p.add_argument('--start', help="起始日期 YYYY-MM-DD（含）")
+    p.add_argument('--end', help="结束日期 YYYY-MM-DD（含）")
+    p.add_argument('--kinds', nargs='+', choices=RECORD_TYPES, default=list(RECORD_TYPES))
+    p.add_argument('-o', '--output', help="输出文件（默认标准输出）")
+
+    p = sub.add_parser('import', help="从 JSONL 或 CSV 导入")
+    p.add_argument('--db', default="tomato_timer_history.db")
+    p.add_argument('--format', choices=('jsonl', 'csv'), help="默认按扩展名判断")
+    p.add_argument('input')
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        records = iter_records(args.db, args.start, args.end, args.kinds)
+        out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+        try:
+            count = (write_csv if args.format == 'csv' else write_jsonl)(records, out)
+        finally:
+            if args.output:
+                out.close()
+        print(f"导出 {count} 条记录", file=sys.stderr)
+    else:
+        fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+        store = HistoryStore(args.db)
+        try:
+            with open(args.input, 'r', newline='', encoding='utf-8') as f:
+                count = import_records(store, read_csv(f) if fmt == 'csv' else read_jsonl(f))
+        finally:
+            store.close()
+        print(f"导入 {count} 条记录", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""今日任务完成时间预测
+
+按任务统计每个番茄实际花费的额外时间（暂停、打断、拖延）和打断次数的指数加权平均，
+用它估计任务队列中每个任务的完成时间。统计保存在 tomato_timer_forecast.json 中，跨天保留。
+"""
+import os, json
+
+import core
+
+
+class Velocity:
+    """一个任务（或全部任务）的指数加权统计"""
+
+    __slots__ = ('overhead', 'interruptions', 'samples', 'gaps')
+
+    def __init__(self, overhead=0.0, interruptions=0.0, samples=0, gaps=0):
+        self.overhead = overhead  # 每个番茄超出名义时长的秒数（暂停、打断、拖延）
+        self.interruptions = interruptions  # 每个番茄的打断次数
+        self.samples = samples  # 番茄数
+        self.gaps = gaps  # 有额外开销样本的番茄数（每段工作的第一个番茄没有）
+
+
+class Forecaster:
+    """按任务的历史速度预测今日任务队列的完成时间
+
+    每完成一个番茄用 EWMA 更新一次，O(1)，不需要重新扫描历史：
+    与上一个番茄完成的间隔减去名义时长（休息 + 工作）即为这个番茄的额外开销。
+    预测时每个任务的番茄按 工作 + 休息（按长休息间隔计算）+ 该任务的平均额外开销 累加；
+    样本不足的任务使用全部任务的平均值。
+    """
+
+    def __init__(self, alpha=0.3, session_gap=3600.0, min_samples=3):
+        self.alpha = alpha  # 新样本的权重
+        self.session_gap = session_gap  # 间隔超出名义时长这么多秒时视为中途离开，不作为样本
+        self.min_samples = min_samples
+        self.tasks = {}  # 任务名 -> Velocity
+        self.overall = Velocity()
+        self.last_completion = None  # 上一个番茄完成的时间戳
+        self.pending_interruptions = 0  # 当前番茄中的打断次数
+
+    # ---- 在线更新 ----
+
+    def _update(self, velocity, field, sample, count):
+        if count == 0:
+            setattr(velocity, field, sample)
+        else:
+            value = getattr(velocity, field)
+            setattr(velocity, field, value + self.alpha * (sample - value))
+
+    def observe_interruption(self):
+        self.pending_interruptions += 1
+
+    def observe_tomato(self, task, now, engine, cycle):
+        """记录完成今天第 cycle 个番茄（task 为空表示没有指定任务）"""
+        velocity = self.tasks.get(task) if task else None
+        if task and velocity is None:
+            velocity = self.tasks[task] = Velocity()
+        targets = [self.overall] + ([velocity] if velocity is not None else [])
+
+        if self.last_completion is not None and cycle > 1:
+            nominal = engine.work_duration * 60 + self.break_after(engine, cycle - 1)
+            gap = now - self.last_completion
+            if 0 <= gap - nominal < self.session_gap:
+                for target in targets:
+                    self._update(target, 'overhead', gap - nominal, target.gaps)
+                    target.gaps += 1
+        for target in targets:
+            self._update(target, 'interruptions', self.pending_interruptions, target.samples)
+            target.samples += 1
+        self.pending_interruptions = 0
+        self.last_completion = now
+
+    # ---- 预测 ----
+
+    @staticmethod
+    def break_after(engine, n):
+        """第 n 个番茄之后的休息秒数"""
+        if n % engine.long_break_interval == 0:
+            return engine.long_break_duration * 60
+        return engine.short_break_duration * 60
+
+    @staticmethod
+    def break_total(engine, first, last):
+        """第 first..last 个番茄之后的休息总秒数，O(1)"""
+        if last < first:
+            return 0
+        interval = engine.long_break_interval
+        longs = last // interval - (first - 1) // interval
+        return longs * engine.long_break_duration * 60 + (last - first + 1 - longs) * engine.short_break_duration * 60
+
+    def velocity(self, task):
+        velocity = self.tasks.get(task)
+        if velocity is None or velocity.samples < self.min_samples:
+            return self.overall
+        return velocity
+
+    def project(self, queue, now, engine, cycle, current_task=""):
+        """预测队列中每个任务的完成时间
+
+        queue 为按顺序的 [(任务名, 剩余番茄数)]，cycle 为今天已完成的番茄数；
+        正在进行的番茄属于 current_task 时，该任务排在最前面。
+        返回 ({任务名: 完成时间戳}, 预计剩余的打断次数)。
+        """
+        in_work = engine.phase == core.WORK
+        t = now
+        if engine.phase != core.IDLE:
+            t += engine.seconds_left()  # 当前阶段结束的时间
+        n = cycle  # 已安排的最后一个番茄的序号
+        if in_work:
+            n += 1  # 正在进行的番茄在 t 时完成
+        need_break = in_work  # 下一个番茄前是否还要先休息
+
+        queue = list(queue)
+        if in_work and current_task:
+            queue.sort(key=lambda item: item[0] != current_task)
+
+        finish = {}
+        interruptions = 0.0
+        work = engine.work_duration * 60
+        for name, remaining in queue:
+            if in_work and name == current_task:
+                remaining -= 1
+                in_work = False
+            if remaining <= 0:
+                finish[name] = t
+                continue
+            # 需要先休息时，第 n..n+remaining-1 个番茄之后各休息一次，否则少一次
+            first = n if need_break else n + 1
+            velocity = self.velocity(name)
+            t += remaining * (work + velocity.overhead) + self.break_total(engine, max(first, 1), n + remaining - 1)
+            interruptions += remaining * velocity.interruptions
+            n += remaining
+            need_break = True
+            finish[name] = t
+        return finish, interruptions
+
+    # ---- 持久化 ----
+
+    def to_dict(self):
+        pack = lambda v: [v.overhead, v.interruptions, v.samples, v.gaps]
+        return {'overall': pack(self.overall), 'tasks': {name: pack(v) for name, v in self.tasks.items()},
+                'last_completion': self.last_completion}
+
+    def load(self, path):
+        """读取保存的统计，文件不存在时保持初始状态"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.overall = Velocity(*data['overall'])
+        self.tasks = {name: Velocity(*values) for name, values in data['tasks'].items()}
+        self.last_completion = data.get('last_completion')
+
+    @staticmethod
+    def save(path, data):
+        """写入 to_dict() 的结果（可在后台线程中调用）"""
+        text = json.dumps(data, ensure_ascii=False)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_file, path)
@@ -0,0 +1,236 @@
+import os, glob, sqlite3, time, threading
+
+import serializers
+from records import TaskRecord, TaskArray, from_dicts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    planned INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    internal_interruptions INTEGER NOT NULL DEFAULT 0,
+    external_interruptions INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (date, name)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_name ON tasks (name, date);
+
+CREATE TABLE IF NOT EXISTS tomatoes (
+    id INTEGER PRIMARY KEY,
+    ts REAL,
+    date TEXT NOT NULL,
+    task TEXT NOT NULL DEFAULT '',
+    phase TEXT NOT NULL DEFAULT 'work'
+);
+CREATE INDEX IF NOT EXISTS idx_tomatoes_date ON tomatoes (date);
+CREATE INDEX IF NOT EXISTS idx_tomatoes_task ON tomatoes (task, date);
+CREATE INDEX IF NOT EXISTS idx_tomatoes_phase ON tomatoes (phase, date);
+
+CREATE TABLE IF NOT EXISTS interruptions (
+    id INTEGER PRIMARY KEY,
+    ts REAL,
+    date TEXT NOT NULL,
+    task TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    phase TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_interruptions_date ON interruptions (date, kind);
+CREATE INDEX IF NOT EXISTS idx_interruptions_task ON interruptions (task, date);
+CREATE INDEX IF NOT EXISTS idx_interruptions_phase ON interruptions (phase, date);
+
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+# 累加某天某个任务名的计数，同一天的同名任务合计为一行
+ADD_TASK_COUNTS = (
+    "INSERT INTO tasks (date, name, planned, completed, internal_interruptions, external_interruptions) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (date, name) DO UPDATE SET planned = planned + excluded.planned, "
+    "completed = completed + excluded.completed, "
+    "internal_interruptions = internal_interruptions + excluded.internal_interruptions, "
+    "external_interruptions = external_interruptions + excluded.external_interruptions")
+
+
+class HistoryStore:
+    """跨日期的 SQLite 历史记录：任务、番茄、打断
+
+    日期统一存为 YYYY-MM-DD 文本，按日期区间查询直接走索引。
+    传入 writer（persistence.WriteBehindWriter）时，实时写入在后台线程执行。
+    """
+
+    def __init__(self, db_file, writer=None):
+        self.db_file = db_file
+        self.writer = writer
+        self.is_new = not os.path.exists(db_file)
+        self.lock = threading.RLock()  # 连接在界面线程和写入线程之间共享
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _write(self, sql, params):
+        def op():
+            with self.lock, self.conn:
+                self.conn.execute(sql, params)
+        if self.writer is not None:
+            self.writer.submit(None, op)
+        else:
+            op()
+
+    # ---- 写入 ----
+
+    def save_task(self, day, task):
+        """写入某天某个任务的计数（已有记录时各字段取较大值，计数只增不减，用于同步合并的结果）"""
+        self._write(
+            "INSERT INTO tasks (date, name, planned, completed, internal_interruptions, external_interruptions) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (date, name) DO UPDATE SET planned = MAX(planned, excluded.planned), "
+            "completed = MAX(completed, excluded.completed), "
+            "internal_interruptions = MAX(internal_interruptions, excluded.internal_interruptions), "
+            "external_interruptions = MAX(external_interruptions, excluded.external_interruptions)",
+            (day, task.name, task.planned, task.completed,
+             task.internal_interruptions, task.external_interruptions))
+
+    def add_task_counts(self, day, name, planned=0, completed=0, internal_interruptions=0, external_interruptions=0):
+        """累加某天某个任务名的计数（同一天的同名任务合计为一行）"""
+        self._write(ADD_TASK_COUNTS, (day, name, planned, completed, internal_interruptions, external_interruptions))
+
+    def add_tomato(self, day, task, ts=None, phase='work'):
+        """记录一个完成的番茄"""
+        self._write("INSERT INTO tomatoes (ts, date, task, phase) VALUES (?, ?, ?, ?)",
+                    (time.time() if ts is None else ts, day, task, phase))
+
+    def add_interruption(self, day, task, kind, phase='', ts=None):
+        """记录一次打断，kind 为 'internal' 或 'external'"""
+        self._write("INSERT INTO interruptions (ts, date, task, kind, phase) VALUES (?, ?, ?, ?, ?)",
+                    (time.time() if ts is None else ts, day, task, kind, phase))
+
+    # ---- 导入旧的 JSON 数据 ----
+
+    def import_day(self, day, tasks):
+        """导入一天的任务列表（原 JSON 快照中的 daily_tasks + completed_tasks），覆盖这一天已有的记录"""
+        with self.lock, self.conn:
+            self._replace_day(day, tasks)
+
+    def import_json_file(self, path):
+        """导入一个 tomato_timer_data.json 格式的文件，已导入且未修改的文件跳过"""
+        mtime = os.path.getmtime(path)
+        with self.lock:
+            row = self.conn.execute("SELECT mtime FROM imported_files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] >= mtime:
+            return False
+        data = serializers.load(path)
+        day = data.get('date') or os.path.splitext(os.path.basename(path))[0]
+        with self.lock, self.conn:
+            self._replace_day(day, from_dicts(data.get('daily_tasks', []) + data.get('completed_tasks', [])))
+            self.conn.execute("INSERT OR REPLACE INTO imported_files (path, mtime) VALUES (?, ?)", (path, mtime))
+        return True
+
+    def _replace_day(self, day, tasks):
+        # JSON 中只有计数没有时间戳，因此逐条记录的 ts 为空
+        for table in ('tasks', 'tomatoes', 'interruptions'):
+            self.conn.execute(f"DELETE FROM {table} WHERE date = ?", (day,))
+        for task in tasks:
+            # 完成后又重新添加的同名任务在 JSON 中是两条，合计为一行
+            self.conn.execute(ADD_TASK_COUNTS, (day, task.name, task.planned, task.completed,
+                                                task.internal_interruptions, task.external_interruptions))
+            self.conn.executemany("INSERT INTO tomatoes (ts, date, task) VALUES (NULL, ?, ?)",
+                                  [(day, task.name)] * task.completed)
+            for kind in ('internal', 'external'):
+                self.conn.executemany("INSERT INTO interruptions (ts, date, task, kind) VALUES (NULL, ?, ?, ?)",
+                                      [(day, task.name, kind)] * getattr(task, f'{kind}_interruptions'))
+
+    def import_json_dir(self, data_dir):
+        """导入目录中所有按日期命名的 JSON 文件（YYYY-MM-DD.json），返回 (导入的文件数, [(路径, 异常)])
+
+        每个文件在自己的事务中导入，一个文件损坏不影响其他文件。
+        """
+        count, failed = 0, []
+        for path in sorted(glob.glob(os.path.join(data_dir, "????-??-??.json"))):
+            try:
+                if self.import_json_file(os.path.abspath(path)):
+                    count += 1
+            except Exception as e:
+                failed.append((path, e))
+        return count, failed
+
+    # ---- 查询 ----
+
+    def tasks_for_date(self, day):
+        """某天的全部任务"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name, planned, completed, internal_interruptions, external_interruptions "
+                "FROM tasks WHERE date = ? ORDER BY id", (day,))
+            return [TaskRecord(*r) for r in rows]
+
+    def task_array(self, start=None, end=None):
+        """日期区间内的全部任务记录，按列存入 TaskArray（大量历史数据常驻内存时使用）"""
+        tasks = TaskArray()
+        with self.lock:
+            for row in self.conn.execute(
+                    "SELECT name, planned, completed, internal_interruptions, external_interruptions "
+                    "FROM tasks WHERE date BETWEEN ? AND ? ORDER BY date, id",
+                    (start or '0000-00-00', end or '9999-99-99')):
+                tasks.append_row(*row)
+        return tasks
+
+    def task_names(self):
+        """所有出现过的任务名"""
+        with self.lock:
+            return [r[0] for r in self.conn.execute("SELECT DISTINCT name FROM tasks")]
+
+    def task_history(self, name, start=None, end=None):
+        """某个任务在日期区间内每天的 (日期, 计划, 完成) 记录"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date, planned, completed FROM tasks WHERE name = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (name, start or '0000-00-00', end or '9999-99-99')).fetchall()
+
+    def events_between(self, after=None, before=None):
+        """after 与 before 之间（都不含）的番茄和打断，按日期和时间排序
+
+        返回 [(日期, 时间戳, 任务名, 类型, 阶段)]，类型为 'tomato' / 'internal' / 'external'。
+        """
+        params = (after or '', before or '9999-99-99')
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date, ts, task, 'tomato', phase FROM tomatoes WHERE date > ? AND date < ? "
+                "UNION ALL "
+                "SELECT date, ts, task, kind, phase FROM interruptions WHERE date > ? AND date < ? "
+                "ORDER BY 1, 2", params + params).fetchall()
+
+    def daily_totals(self, start, end):
+        """日期区间内每天的 (日期, 番茄数, 内部打断, 外部打断)"""
+        with self.lock:
+            totals = {}
+            for day, count in self.conn.execute(
+                    "SELECT date, COUNT(*) FROM tomatoes WHERE date BETWEEN ? AND ? AND phase = 'work' GROUP BY date",
+                    (start, end)):
+                totals[day] = [day, count, 0, 0]
+            for day, kind, count in self.conn.execute(
+                    "SELECT date, kind, COUNT(*) FROM interruptions WHERE date BETWEEN ? AND ? GROUP BY date, kind",
+                    (start, end)):
+                row = totals.setdefault(day, [day, 0, 0, 0])
+                row[2 if kind == 'internal' else 3] += count
+            return [tuple(totals[day]) for day in sorted(totals)]
+
+    def range_totals(self, start, end):
+        """日期区间内的汇总 (番茄数, 内部打断, 外部打断, 计划番茄, 完成番茄)"""
+        with self.lock:
+            tomatoes = self.conn.execute(
+                "SELECT COUNT(*) FROM tomatoes WHERE date BETWEEN ? AND ? AND phase = 'work'", (start, end)).fetchone()[0]
+            counts = dict(self.conn.execute(
+                "SELECT kind, COUNT(*) FROM interruptions WHERE date BETWEEN ? AND ? GROUP BY kind", (start, end)))
+            planned, completed = self.conn.execute(
+                "SELECT COALESCE(SUM(planned), 0), COALESCE(SUM(completed), 0) FROM tasks WHERE date BETWEEN ? AND ?",
+                (start, end)).fetchone()
+            return tomatoes, counts.get('internal', 0), counts.get('external', 0), planned, completed
@@ -0,0 +1,49 @@
+import json
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtNetwork import QLocalServer
+
+import ipc
+
+
+class CommandServer(QObject):
+    """单实例守护 + 命令通道：在界面线程中接收 ipc.py 客户端的请求
+
+    handler(request) 返回回复字典；抛出 ValueError / KeyError / TypeError 时回复错误信息。
+    """
+
+    def __init__(self, handler, path=None, parent=None):
+        super().__init__(parent)
+        self.handler = handler
+        self.path = path or ipc.socket_path()
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        """开始监听；已有其他实例在运行时返回 False"""
+        if self.server.listen(self.path):
+            return True
+        # socket 文件已存在：要么另一个实例正在运行，要么是上次异常退出留下的
+        if ipc.ping(self.path):
+            return False
+        QLocalServer.removeServer(self.path)
+        return self.server.listen(self.path)
+
+    def close(self):
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            sock.readyRead.connect(lambda sock=sock: self.on_ready_read(sock))
+            sock.disconnected.connect(sock.deleteLater)
+
+    def on_ready_read(self, sock):
+        while sock.canReadLine():
+            try:
+                reply = self.handler(json.loads(bytes(sock.readLine())))
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {'ok': False, 'error': str(e)}
+            sock.write((json.dumps(reply, ensure_ascii=False) + "\n").encode('utf-8'))
+            sock.flush()
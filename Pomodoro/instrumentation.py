@@ -0,0 +1,196 @@
+import os, json, time, bisect, functools, threading
+import logging, logging.handlers
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 默认桶边界（秒），覆盖 0.1 毫秒到 10 秒
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+# 默认被计时的 TomatoTimer 方法
+HOT_METHODS = ('save_data', 'load_data', 'update_tasks_list', 'update_stats',
+               'update_timer', 'add_task', 'mark_task_completed')
+
+
+class Histogram:
+    """累积直方图（与 Prometheus histogram 的语义一致）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))}
+
+
+class Metrics:
+    """线程安全的指标集合：按名称分组的直方图"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (指标名, 标签值) -> Histogram
+
+    def observe(self, metric, label, value):
+        with self.lock:
+            hist = self.histograms.get((metric, label))
+            if hist is None:
+                hist = self.histograms[(metric, label)] = Histogram()
+            hist.observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {f"{metric}{{{label}}}" if label else metric: hist.snapshot()
+                    for (metric, label), hist in self.histograms.items()}
+
+    def prometheus_text(self):
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self.lock:
+            seen = set()
+            for (metric, label), hist in sorted(self.histograms.items()):
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} histogram")
+                    seen.add(metric)
+                labels = f'{label},' if label else ''
+                cumulative = 0
+                for bound, count in zip([str(b) for b in hist.buckets] + ['+Inf'], hist.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels}le="{bound}"}} {cumulative}')
+                suffix = f'{{{label}}}' if label else ''
+                lines.append(f"{metric}_sum{suffix} {hist.sum}")
+                lines.append(f"{metric}_count{suffix} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def instrument_class(cls, metrics, method_names=HOT_METHODS):
+    """把类上的方法替换为计时包装（在创建实例、连接信号之前调用）
+
+    update_timer 额外记录实际唤醒时间相对实例 tick_due 的延迟。
+    """
+    for name in method_names:
+        original = getattr(cls, name)
+
+        def make_wrapper(original, name):
+            label = f'method="{name}"'
+
+            @functools.wraps(original)
+            def wrapper(self, *args, **kwargs):
+                if name == 'update_timer' and getattr(self, 'tick_due', None) is not None:
+                    metrics.observe('pomodoro_tick_lateness_seconds', '', max(0.0, time.monotonic() - self.tick_due))
+                start = time.perf_counter()
+                try:
+                    return original(self, *args, **kwargs)
+                finally:
+                    metrics.observe('pomodoro_call_seconds', label, time.perf_counter() - start)
+            return wrapper
+
+        setattr(cls, name, make_wrapper(original, name))
+
+
+class StallMonitor:
+    """事件循环卡顿检测：固定间隔的心跳定时器，记录实际间隔超出预期的部分"""
+
+    def __init__(self, metrics, interval_ms=100, parent=None):
+        from PyQt5.QtCore import QTimer, Qt
+        self.metrics = metrics
+        self.interval = interval_ms / 1000
+        self.last = time.monotonic()
+        self.timer = QTimer(parent)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.beat)
+        self.timer.start(interval_ms)
+
+    def beat(self):
+        now = time.monotonic()
+        self.metrics.observe('pomodoro_event_loop_stall_seconds', '', max(0.0, now - self.last - self.interval))
+        self.last = now
+
+
+class FileExporter:
+    """定期把指标快照以 JSON 行写入按大小轮转的本地文件（后台线程）"""
+
+    def __init__(self, metrics, path, interval=60.0, max_bytes=1024 * 1024, backup_count=3):
+        self.metrics = metrics
+        self.interval = interval
+        self.logger = logging.getLogger(f"pomodoro.metrics.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding='utf-8')
+        self.logger.addHandler(self.handler)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+
+    def export(self):
+        self.logger.info(json.dumps({'ts': time.time(), 'metrics': self.metrics.snapshot()}))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.export()
+        self.handler.close()
+
+
+class PrometheusServer:
+    """在 127.0.0.1 上提供 /metrics（Prometheus 文本格式）"""
+
+    def __init__(self, metrics, port):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def enabled():
+    """是否通过环境变量 POMODORO_METRICS 开启了性能指标"""
+    return os.environ.get('POMODORO_METRICS', '') not in ('', '0')
+
+
+def setup(cls):
+    """按环境变量开启指标收集，返回 Metrics；未开启时返回 None
+
+    POMODORO_METRICS=1          开启
+    POMODORO_METRICS_FILE=路径   轮转指标文件（默认 tomato_timer_metrics.log）
+    POMODORO_METRICS_PORT=端口   在 127.0.0.1 上提供 Prometheus /metrics
+    """
+    if not enabled():
+        return None
+    metrics = Metrics()
+    instrument_class(cls, metrics)
+    metrics.exporters = [FileExporter(metrics, os.environ.get('POMODORO_METRICS_FILE', 'tomato_timer_metrics.log'))]
+    port = os.environ.get('POMODORO_METRICS_PORT')
+    if port:
+        metrics.exporters.append(PrometheusServer(metrics, int(port)))
+    return metrics
@@ -0,0 +1,88 @@
+"""单实例命令通道的客户端（不依赖 Qt）
+
+正在运行的番茄钟在 Unix socket 上监听（instance.CommandServer），每行一个 JSON 请求、
+一个 JSON 回复。本模块只用标准库，启动和往返都在毫秒级，适合绑定到快捷键或脚本。
+
+用法:
+    python ipc.py start [--task 写代码]
+    python ipc.py pause | reset | status | show
+    python ipc.py add-task 写代码 -n 3
+    python ipc.py interrupt internal | external
+"""
+import os, sys, json, socket, argparse, tempfile
+
+
+def available():
+    """当前平台是否支持 Unix socket"""
+    return hasattr(socket, 'AF_UNIX')
+
+
+def socket_path():
+    """每个用户一个 socket 文件，优先放在 XDG_RUNTIME_DIR"""
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    base = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(base, f"pomodoro-{user}.sock")
+
+
+def send_command(request, path=None, timeout=2.0):
+    """发送一条命令并返回回复字典；没有正在运行的实例时抛出 OSError"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode('utf-8'))
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("连接在收到回复前关闭")
+            data += chunk
+    return json.loads(data)
+
+
+def ping(path=None):
+    """是否有实例在 path 上响应"""
+    try:
+        send_command({'cmd': 'status'}, path, timeout=0.5)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def format_status(reply):
+    minutes, seconds = divmod(reply['remaining'], 60)
+    state = "已暂停" if reply['paused'] else reply['phase']
+    task = f"，任务：{reply['task']}" if reply.get('task') else ""
+    return f"{state} {minutes:02d}:{seconds:02d}，今日番茄 {reply['cycle']}{task}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="控制正在运行的番茄钟")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('start', help="开始或继续")
+    p.add_argument('--task', help="空闲时开始的任务名")
+    sub.add_parser('pause', help="暂停")
+    sub.add_parser('reset', help="重置")
+    sub.add_parser('status', help="显示当前状态")
+    sub.add_parser('show', help="把窗口调到前台")
+    p = sub.add_parser('add-task', help="添加任务")
+    p.add_argument('name')
+    p.add_argument('-n', '--planned', type=int, default=1, help="计划番茄数")
+    p = sub.add_parser('interrupt', help="记录一次打断")
+    p.add_argument('kind', choices=('internal', 'external'))
+    args = parser.parse_args()
+
+    request = {k: v for k, v in vars(args).items() if v is not None}
+    try:
+        reply = send_command(request)
+    except OSError as e:
+        print(f"番茄钟未运行（{e}）", file=sys.stderr)
+        return 2
+    if not reply.get('ok'):
+        print(f"失败：{reply.get('error')}", file=sys.stderr)
+        return 1
+    print(format_status(reply))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
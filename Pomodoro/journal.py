@@ -0,0 +1,138 @@
+import os, json, time, threading
+
+import serializers
+
+# 事件类型
+TASK_ADDED = "task_added"
+TOMATO_COMPLETED = "tomato_completed"
+INTERRUPTION = "interruption"
+SETTINGS_CHANGED = "settings_changed"
+
+
+class EventJournal:
+    """追加式事件日志：快照文件 + 日志尾部
+
+    快照即原来的 tomato_timer_data.json，日志写在同目录的 ``.journal`` 文件中，
+    每行一个 JSON 事件。启动时读取快照再重放日志尾部即可恢复状态。
+
+    传入 writer（persistence.WriteBehindWriter）时，append() 和 write_snapshot()
+    只在调用线程中序列化，文件写入由后台线程合并完成；否则立即同步写入。
+    快照用 codec（serializers 中的编解码器）编码，读取时自动识别格式。
+    """
+
+    def __init__(self, data_file, compact_every=200, writer=None, fsync_interval=5.0, codec=None):
+        self.data_file = data_file
+        self.journal_file = data_file + ".journal"
+        self.compact_every = compact_every  # 日志累积多少条后压缩成快照
+        self.writer = writer
+        self.fsync_interval = fsync_interval  # 日志两次 fsync 之间至少间隔的秒数
+        self.codec = codec or serializers.get_codec('json')
+        self.seq = 0  # 最后一条事件的序号
+        self.pending_events = 0  # 上次快照后新增的事件数
+        self._fp = None
+        self._lock = threading.Lock()
+        self._lines = []  # 待写入的日志行
+        self._snapshot = None  # 待写入的快照（已编码的 bytes）
+        self._last_fsync = time.monotonic()
+
+    def load(self):
+        """读取快照并返回 (快照数据, 需要重放的事件列表)"""
+        snapshot = None
+        if os.path.exists(self.data_file):
+            snapshot = serializers.load(self.data_file)
+        snapshot_seq = snapshot.get('journal_seq', 0) if snapshot else 0
+        self.seq = snapshot_seq
+
+        events = []
+        if os.path.exists(self.journal_file):
+            good_offset = 0
+            terminated = True
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # 崩溃时写了一半的最后一行，丢弃
+                        break
+                    good_offset += len(line)
+                    terminated = line.endswith(b"\n")
+                    # 快照已包含的事件（写快照后、截断日志前崩溃）跳过
+                    if event.get('seq', 0) > snapshot_seq:
+                        events.append(event)
+                        self.seq = event['seq']
+            if good_offset < os.path.getsize(self.journal_file):
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(good_offset)
+            elif not terminated:
+                # 最后一行完整但缺少换行符，补上，否则下一次追加会接在这一行后面
+                with open(self.journal_file, 'ab') as f:
+                    f.write(b"\n")
+        self.pending_events = len(events)
+        return snapshot, events
+
+    def append(self, event_type, **payload):
+        """追加一条事件，返回写入的事件"""
+        self.seq += 1
+        event = {'seq': self.seq, 'type': event_type, 'ts': time.time()}
+        event.update(payload)
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._lines.append(line)
+        self.pending_events += 1
+        self._schedule()
+        return event
+
+    def needs_compaction(self):
+        """日志是否已长到需要压缩"""
+        return self.pending_events >= self.compact_every
+
+    def write_snapshot(self, data):
+        """写入快照并清空日志
+
+        快照包含到目前为止的全部事件，因此尚未写出的日志行可以直接丢弃。
+        """
+        raw = self.codec.encode(dict(data, journal_seq=self.seq))
+        with self._lock:
+            self._snapshot = raw
+            self._lines = []
+        self.pending_events = 0
+        self._schedule()
+
+    def _schedule(self):
+        if self.writer is not None:
+            self.writer.submit(("journal", self.journal_file), self.sync)
+        else:
+            self.sync()
+
+    def sync(self):
+        """把待写入的快照和日志行写到磁盘（后台线程中执行）"""
+        with self._lock:
+            snapshot, self._snapshot = self._snapshot, None
+            lines, self._lines = self._lines, []
+
+        if snapshot is not None:
+            # 原子写入快照（临时文件 + 重命名），然后清空日志
+            tmp_file = self.data_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.data_file)
+            self.close()
+            open(self.journal_file, 'w').close()
+
+        if lines:
+            if self._fp is None:
+                self._fp = open(self.journal_file, 'a', encoding='utf-8')
+            self._fp.write("".join(lines))
+            self._fp.flush()
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._fp.fileno())
+                self._last_fsync = time.monotonic()
+
+    def close(self):
+        """关闭日志文件句柄"""
+        if self._fp is not None:
+            os.fsync(self._fp.fileno())
+            self._fp.close()
+            self._fp = None
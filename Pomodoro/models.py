@@ -0,0 +1,79 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class TaskListModel(QAbstractListModel):
+    """任务列表模型：直接包装任务记录列表，按行发出增删改信号
+
+    列表的所有修改都应通过本模型的方法进行，视图只重绘受影响的行；
+    显示文字在 data() 中按需格式化，只有可见的行才会被渲染。
+    """
+
+    def __init__(self, formatter, tasks=None, parent=None):
+        super().__init__(parent)
+        self.formatter = formatter  # task -> 显示文字
+        self.tasks = tasks if tasks is not None else []
+        self._rows = {}  # id(任务) -> 行号，前 _valid_rows 行的缓存有效
+        self._valid_rows = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tasks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.tasks):
+            return None
+        task = self.tasks[index.row()]
+        if role == Qt.DisplayRole:
+            return self.formatter(task)
+        if role == Qt.UserRole:
+            return task
+        return None
+
+    def row_of(self, task):
+        """任务所在的行号（按对象比较）
+
+        行号缓存在末尾追加时直接更新；删除一行后其后的行号失效，下次查找时才重建失效的部分。
+        """
+        row = self._rows.get(id(task))
+        if row is not None and row < self._valid_rows and self.tasks[row] is task:
+            return row
+        for r in range(self._valid_rows, len(self.tasks)):
+            self._rows[id(self.tasks[r])] = r
+        self._valid_rows = len(self.tasks)
+        row = self._rows.get(id(task))
+        return row if row is not None and row < len(self.tasks) and self.tasks[row] is task else -1
+
+    def set_tasks(self, tasks):
+        """整体替换任务列表（加载数据或每日重置时使用）"""
+        self.beginResetModel()
+        self.tasks = tasks
+        self._rows = {}
+        self._valid_rows = 0
+        self.endResetModel()
+
+    def append_task(self, task):
+        """在末尾追加一个任务"""
+        row = len(self.tasks)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.tasks.append(task)
+        if self._valid_rows == row:
+            self._rows[id(task)] = row
+            self._valid_rows = row + 1
+        self.endInsertRows()
+
+    def remove_task(self, task):
+        """移除一个任务"""
+        row = self.row_of(task)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.tasks[row]
+        del self._rows[id(task)]
+        self._valid_rows = min(self._valid_rows, row)
+        self.endRemoveRows()
+
+    def task_changed(self, task):
+        """任务的计数变化后只刷新该行"""
+        row = self.row_of(task)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
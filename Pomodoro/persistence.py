@@ -0,0 +1,85 @@
+import os, threading, time
+from collections import OrderedDict
+
+
+def write_file(path, raw):
+    """原子写入 bytes（临时文件 + fsync + 重命名），在写入线程中调用"""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+class WriteBehindWriter:
+    """后台写入线程：界面线程只提交写操作，磁盘 I/O 在工作线程中完成
+
+    用相同 key 提交的操作在执行前会合并为一次（只保留最后提交的函数），
+    key 为 None 的操作不合并。每批操作前等待 delay 秒，让连续的修改合并写入。
+    """
+
+    def __init__(self, delay=0.5, on_error=None):
+        self.delay = delay  # 合并写入的等待时间（秒）
+        self.on_error = on_error  # 写入失败时在工作线程中调用 on_error(异常)
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._stopping = False
+        self._flushers = 0  # 正在 flush() 中等待的线程数
+        self._anon = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, func):
+        """提交一个写操作"""
+        with self._cond:
+            if key is None:
+                self._anon += 1
+                key = ("anon", self._anon)
+            # 已在队列中时保持原来的排队位置，只替换为最新的函数
+            self._pending[key] = func
+            self._cond.notify_all()
+
+    def flush(self):
+        """阻塞直到已提交的操作全部写完（关闭窗口、跨天时使用）"""
+        with self._cond:
+            self._flushers += 1
+            self._cond.notify_all()
+            while self._pending or self._busy:
+                self._cond.wait()
+            self._flushers -= 1
+
+    def close(self):
+        """写完剩余操作并结束线程"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # 等待一小段时间，合并连续的修改（flush/close 时立即写入）
+                deadline = time.monotonic() + self.delay
+                while not self._stopping and not self._flushers:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch = list(self._pending.values())
+                self._pending.clear()
+                self._busy = True
+            for func in batch:
+                try:
+                    func()
+                except Exception as e:
+                    if self.on_error is not None:
+                        self.on_error(e)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
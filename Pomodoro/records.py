@@ -0,0 +1,102 @@
+from array import array
+from dataclasses import dataclass
+
+# 任务在数据文件中的字段（JSON 快照中的字典键）
+TASK_FIELDS = ('name', 'planned', 'completed', 'internal_interruptions', 'external_interruptions')
+COUNTER_FIELDS = TASK_FIELDS[1:]
+
+
+@dataclass(slots=True, eq=False)
+class TaskRecord:
+    """一个任务的计数（__slots__，没有每个实例的 __dict__）
+
+    按对象身份比较和哈希，任务模型和索引都依赖这一点。
+    """
+    name: str
+    planned: int = 0
+    completed: int = 0
+    internal_interruptions: int = 0
+    external_interruptions: int = 0
+
+    def to_dict(self):
+        return {'name': self.name, 'planned': self.planned, 'completed': self.completed,
+                'internal_interruptions': self.internal_interruptions,
+                'external_interruptions': self.external_interruptions}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data.get('planned', 0), data.get('completed', 0),
+                   data.get('internal_interruptions', 0), data.get('external_interruptions', 0))
+
+
+def to_dicts(tasks):
+    """任务记录列表 -> 字典列表（写入数据文件时使用）"""
+    return [task.to_dict() for task in tasks]
+
+
+def from_dicts(items):
+    """字典列表 -> 任务记录列表（读取数据文件时使用）"""
+    return [TaskRecord.from_dict(item) for item in items]
+
+
+class TaskArray:
+    """按列存储的大量任务记录（用于历史数据）
+
+    每个计数字段是一个 array('I')，任务名去重后只存编号，单条记录约二十字节；
+    按下标访问时才临时构造 TaskRecord。
+    """
+
+    def __init__(self, tasks=()):
+        self.names = []  # 编号 -> 任务名
+        self.name_codes = {}  # 任务名 -> 编号
+        self.name = array('I')
+        self.planned = array('I')
+        self.completed = array('I')
+        self.internal_interruptions = array('I')
+        self.external_interruptions = array('I')
+        self.extend(tasks)
+
+    def _code(self, name):
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def append_row(self, name, planned=0, completed=0, internal=0, external=0):
+        self.name.append(self._code(name))
+        self.planned.append(planned)
+        self.completed.append(completed)
+        self.internal_interruptions.append(internal)
+        self.external_interruptions.append(external)
+
+    def append(self, task):
+        """追加一个 TaskRecord 或任务字典"""
+        if isinstance(task, dict):
+            task = TaskRecord.from_dict(task)
+        self.append_row(task.name, task.planned, task.completed,
+                        task.internal_interruptions, task.external_interruptions)
+
+    def extend(self, tasks):
+        for task in tasks:
+            self.append(task)
+
+    def __len__(self):
+        return len(self.name)
+
+    def __getitem__(self, i):
+        return TaskRecord(self.names[self.name[i]], self.planned[i], self.completed[i],
+                          self.internal_interruptions[i], self.external_interruptions[i])
+
+    def __iter__(self):
+        names = self.names
+        for row in zip(self.name, self.planned, self.completed,
+                       self.internal_interruptions, self.external_interruptions):
+            yield TaskRecord(names[row[0]], *row[1:])
+
+    def total(self, field):
+        """某个计数字段的总和"""
+        return sum(getattr(self, field))
+
+    def to_dicts(self):
+        return [task.to_dict() for task in self]
@@ -0,0 +1,274 @@
+"""周报 / 月报：每日番茄数、打断趋势、各任务计划与完成
+
+报告在 ProcessPoolExecutor 的子进程中生成（用只读连接读取历史库），不占用界面线程。
+输出一个 HTML 文件（图表为内嵌 SVG）；安装了 matplotlib 时另外输出一张 PNG 图表。
+子进程通过 multiprocessing 队列回报进度，ReportService 的监听线程把进度交给回调。
+生成结果按日期区间缓存，区间内记录了新的番茄或打断时失效。
+
+用法:
+    python report.py --db tomato_timer_history.db --start 2024-01-01 --end 2024-01-31 -o reports
+"""
+import os, sys, html, sqlite3, argparse, threading, multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, timedelta
+
+try:
+    import matplotlib
+except ImportError:
+    matplotlib = None
+
+TOP_TASKS = 20  # 计划与完成图表中最多显示的任务数
+COLORS = {'tomatoes': "#d32f2f", 'internal': "#f57c00", 'external': "#1976d2",
+          'planned': "#bdbdbd", 'completed': "#388e3c"}
+
+_progress_queue = None  # 子进程中的进度队列（由进程池的 initializer 设置）
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _progress(key, done, total, message):
+    if _progress_queue is not None:
+        _progress_queue.put((key, done, total, message))
+
+
+def days_between(start, end):
+    """start..end 之间的每一天（end 可以是 2024-02-31 这样的月末上界）"""
+    days = []
+    d = date.fromisoformat(start)
+    while d.isoformat() <= end:
+        days.append(d.isoformat())
+        d += timedelta(days=1)
+    return days
+
+
+def collect(conn, start, end, key=None):
+    """读取报告所需的数据：每日番茄与打断、各任务的计划与完成"""
+    steps = 3 + (matplotlib is not None) + 1
+    days = days_between(start, end)
+    tomatoes = dict.fromkeys(days, 0)
+    internal = dict.fromkeys(days, 0)
+    external = dict.fromkeys(days, 0)
+
+    _progress(key, 0, steps, "读取番茄记录")
+    for day, count in conn.execute(
+            "SELECT date, COUNT(*) FROM tomatoes WHERE date BETWEEN ? AND ? AND phase = 'work' GROUP BY date",
+            (start, end)):
+        tomatoes[day] = count
+
+    _progress(key, 1, steps, "读取打断记录")
+    for day, kind, count in conn.execute(
+            "SELECT date, kind, COUNT(*) FROM interruptions WHERE date BETWEEN ? AND ? GROUP BY date, kind",
+            (start, end)):
+        (internal if kind == 'internal' else external)[day] = count
+
+    _progress(key, 2, steps, "读取任务记录")
+    tasks = conn.execute(
+        "SELECT name, SUM(planned), SUM(completed) FROM tasks WHERE date BETWEEN ? AND ? "
+        "GROUP BY name ORDER BY SUM(planned) DESC, name LIMIT ?", (start, end, TOP_TASKS)).fetchall()
+
+    return {'start': start, 'end': end, 'days': days,
+            'tomatoes': [tomatoes[d] for d in days],
+            'internal': [internal[d] for d in days],
+            'external': [external[d] for d in days],
+            'tasks': tasks, 'steps': steps}
+
+
+# ---- HTML / SVG ----
+
+def svg_bars(labels, series, width=720, height=220):
+    """分组柱状图，series 为 [(名称, 数值列表, 颜色)]"""
+    pad_left, pad_bottom, pad_top = 36, 40, 10
+    plot_w, plot_h = width - pad_left - 10, height - pad_bottom - pad_top
+    peak = max([1] + [v for _, values, _ in series for v in values])
+    group_w = plot_w / max(1, len(labels))
+    bar_w = group_w * 0.8 / max(1, len(series))
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-size="10">',
+             f'<line x1="{pad_left}" y1="{pad_top + plot_h}" x2="{width - 10}" y2="{pad_top + plot_h}" stroke="#999"/>',
+             f'<text x="{pad_left - 4}" y="{pad_top + 8}" text-anchor="end">{peak}</text>']
+    for i, label in enumerate(labels):
+        x0 = pad_left + i * group_w + group_w * 0.1
+        for j, (name, values, color) in enumerate(series):
+            h = values[i] / peak * plot_h
+            parts.append(f'<rect x="{x0 + j * bar_w:.1f}" y="{pad_top + plot_h - h:.1f}" width="{bar_w:.1f}" '
+                         f'height="{h:.1f}" fill="{color}"><title>{html.escape(str(label))} {name}: {values[i]}</title></rect>')
+        # 标签太多时隔几个显示一个
+        if i % max(1, len(labels) // 16) == 0:
+            parts.append(f'<text x="{x0 + group_w * 0.4:.1f}" y="{pad_top + plot_h + 14}" text-anchor="middle">'
+                         f'{html.escape(str(label))}</text>')
+    legend_x = pad_left
+    for name, _, color in series:
+        parts.append(f'<rect x="{legend_x}" y="{height - 14}" width="10" height="10" fill="{color}"/>'
+                     f'<text x="{legend_x + 14}" y="{height - 5}">{name}</text>')
+        legend_x += 80
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def render_html(data):
+    short_days = [d[5:] for d in data['days']]
+    names = [name for name, _, _ in data['tasks']]
+    total_planned = sum(p for _, p, _ in data['tasks'])
+    total_completed = sum(c for _, _, c in data['tasks'])
+    rows = "".join(f"<tr><td>{html.escape(name)}</td><td>{planned}</td><td>{completed}</td></tr>"
+                   for name, planned, completed in data['tasks'])
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>番茄钟报告 {data['start']} ~ {data['end']}</title>
+<style>body{{font-family:sans-serif;margin:24px}}table{{border-collapse:collapse}}td,th{{border:1px solid #ccc;padding:2px 8px}}</style>
+</head><body>
+<h1>番茄钟报告 {data['start']} ~ {data['end']}</h1>
+<p>番茄 {sum(data['tomatoes'])} 个，内部打断 {sum(data['internal'])} 次，外部打断 {sum(data['external'])} 次，
+计划 {total_planned} 个番茄，完成 {total_completed} 个（前 {TOP_TASKS} 个任务）</p>
+<h2>每日番茄</h2>
+{svg_bars(short_days, [("番茄", data['tomatoes'], COLORS['tomatoes'])])}
+<h2>打断趋势</h2>
+{svg_bars(short_days, [("内部打断", data['internal'], COLORS['internal']), ("外部打断", data['external'], COLORS['external'])])}
+<h2>各任务计划与完成</h2>
+{svg_bars(names, [("计划", [p for _, p, _ in data['tasks']], COLORS['planned']), ("完成", [c for _, _, c in data['tasks']], COLORS['completed'])])}
+<table><tr><th>任务</th><th>计划番茄</th><th>完成番茄</th></tr>{rows}</table>
+</body></html>
+"""
+
+
+def render_png(data, path):
+    """用 matplotlib 把三张图表画到一张 PNG 中"""
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    x = range(len(data['days']))
+    fig, axes = plt.subplots(3, 1, figsize=(10, 10))
+    axes[0].bar(x, data['tomatoes'], color=COLORS['tomatoes'])
+    axes[0].set_title("Tomatoes per day")
+    axes[1].plot(x, data['internal'], color=COLORS['internal'], label="internal")
+    axes[1].plot(x, data['external'], color=COLORS['external'], label="external")
+    axes[1].set_title("Interruptions per day")
+    axes[1].legend()
+    for ax in axes[:2]:
+        ax.set_xticks(list(x)[::max(1, len(data['days']) // 10)])
+        ax.set_xticklabels([d[5:] for d in data['days']][::max(1, len(data['days']) // 10)])
+    positions = range(len(data['tasks']))
+    axes[2].barh([p - 0.2 for p in positions], [p for _, p, _ in data['tasks']], 0.4,
+                 color=COLORS['planned'], label="planned")
+    axes[2].barh([p + 0.2 for p in positions], [c for _, _, c in data['tasks']], 0.4,
+                 color=COLORS['completed'], label="completed")
+    axes[2].set_yticks(list(positions))
+    axes[2].set_yticklabels([name for name, _, _ in data['tasks']])
+    axes[2].invert_yaxis()
+    axes[2].set_title("Planned vs completed")
+    axes[2].legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+def build_report(db_file, start, end, out_dir, key=None):
+    """生成一份报告（在子进程中运行），返回 {'start', 'end', 'html', 'png', 'tomatoes'}"""
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        data = collect(conn, start, end, key)
+    finally:
+        conn.close()
+
+    steps = data['steps']
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, f"report_{start}_{end}")
+    _progress(key, 3, steps, "生成 HTML")
+    with open(base + ".html", 'w', encoding='utf-8') as f:
+        f.write(render_html(data))
+    png = None
+    if matplotlib is not None:
+        _progress(key, 4, steps, "生成 PNG")
+        png = base + ".png"
+        render_png(data, png)
+    _progress(key, steps, steps, "完成")
+    return {'start': start, 'end': end, 'html': base + ".html", 'png': png, 'tomatoes': sum(data['tomatoes'])}
+
+
+class ReportService:
+    """在进程池中生成报告，按日期区间缓存结果
+
+    on_progress(key, 已完成步数, 总步数, 说明) 在监听线程中调用，key 为 (start, end)。
+    request() 可在任意线程中调用；返回的 Future 在结果可用时完成（命中缓存时立即完成）。
+    """
+
+    def __init__(self, db_file, out_dir, on_progress=None, max_workers=1):
+        self.db_file = db_file
+        self.out_dir = out_dir
+        self.on_progress = on_progress
+        self.lock = threading.Lock()
+        self.cache = {}  # (start, end) -> 结果
+        self.pending = {}  # (start, end) -> 正在生成的 Future
+        self.stale = set()  # 生成期间失效的区间，结果不写入缓存
+        # 子进程不继承界面进程的线程和 Qt 状态
+        context = multiprocessing.get_context('spawn')
+        self.queue = context.Queue()
+        self.executor = ProcessPoolExecutor(max_workers, mp_context=context,
+                                            initializer=_init_worker, initargs=(self.queue,))
+        self._listener = threading.Thread(target=self._listen, name="report-progress", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.on_progress is not None:
+                self.on_progress(*item)
+
+    def request(self, start, end):
+        """取得日期区间的报告，没有缓存时提交到进程池（同一区间不会重复生成）"""
+        key = (start, end)
+        with self.lock:
+            if key in self.cache:
+                future = Future()
+                future.set_result(self.cache[key])
+                return future
+            if key in self.pending:
+                return self.pending[key]
+            self.stale.discard(key)
+            future = self.executor.submit(build_report, self.db_file, start, end, self.out_dir, key)
+            self.pending[key] = future
+        future.add_done_callback(lambda f: self._finished(key, f))
+        return future
+
+    def _finished(self, key, future):
+        with self.lock:
+            self.pending.pop(key, None)
+            if key in self.stale:
+                self.stale.discard(key)
+            elif not future.cancelled() and future.exception() is None:
+                self.cache[key] = future.result()
+
+    def invalidate(self, day=None):
+        """日期 day 的记录变化后，丢弃包含该日期的报告（day 为 None 时全部丢弃）"""
+        covers = lambda key: day is None or key[0] <= day <= key[1]
+        with self.lock:
+            for key in [k for k in self.cache if covers(k)]:
+                del self.cache[key]
+            self.stale.update(k for k in self.pending if covers(k))
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.queue.put(None)
+        self._listener.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成番茄钟报告")
+    parser.add_argument('--db', default="tomato_timer_history.db", help="历史库文件")
+    parser.add_argument('--start', required=True, help="开始日期 YYYY-MM-DD")
+    parser.add_argument('--end', required=True, help="结束日期 YYYY-MM-DD")
+    parser.add_argument('-o', '--output', default="reports", help="输出目录")
+    args = parser.parse_args()
+
+    result = build_report(args.db, args.start, args.end, args.output)
+    print(result['html'])
+    if result['png']:
+        print(result['png'])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""快照数据的版本与迁移
+
+快照中的 schema_version 记录数据格式版本（没有该字段的旧文件为版本 1）。
+读取时依次执行 MIGRATIONS 中的迁移函数，把数据升级到 SCHEMA_VERSION。
+修改快照格式时：SCHEMA_VERSION 加一，并在 MIGRATIONS 中登记从上一版本升级的函数。
+"""
+
+SCHEMA_VERSION = 2
+
+
+class NewerSchemaError(ValueError):
+    """数据由更新版本的程序保存，不能升级也不能覆盖"""
+
+
+def migrate_1_to_2(data):
+    """版本 1 只保存了打断总数：扣除已计入已完成任务的部分，得到尚未计入任务的打断"""
+    if 'pending_interruptions' not in data:
+        stats = data.get('stats', {})
+        completed = data.get('completed_tasks', [])
+        data['pending_interruptions'] = {
+            kind: max(0, stats.get(f'{kind}_interruptions', 0) - sum(t.get(f'{kind}_interruptions', 0) for t in completed))
+            for kind in ('internal', 'external')
+        }
+    return data
+
+
+# 版本 n -> 迁移到 n + 1 的函数
+MIGRATIONS = {
+    1: migrate_1_to_2,
+}
+
+
+def migrate(data):
+    """把任意旧版本的快照升级到当前版本；版本比程序更新时抛出 NewerSchemaError"""
+    version = data.get('schema_version', 1)
+    if version > SCHEMA_VERSION:
+        raise NewerSchemaError(f"数据版本 {version} 比程序支持的版本 {SCHEMA_VERSION} 更新，请升级程序")
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data)
+        version += 1
+    data['schema_version'] = version
+    validate(data)
+    return data
+
+
+def validate(data):
+    """检查快照的基本结构，格式错误时抛出 ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("快照不是对象")
+    for key in ('daily_tasks', 'completed_tasks'):
+        tasks = data.get(key, [])
+        if not isinstance(tasks, list) or not all(isinstance(t, dict) and 'name' in t for t in tasks):
+            raise ValueError(f"快照中的 {key} 格式错误")
+    for key in ('settings', 'stats', 'pending_interruptions'):
+        if not isinstance(data.get(key, {}), dict):
+            raise ValueError(f"快照中的 {key} 格式错误")
@@ -0,0 +1,90 @@
+"""快照文件的编解码器
+
+所有编解码器都把数据（字典）编码为 bytes。读取时按文件开头的标识自动识别格式，
+因此切换编解码器后旧文件仍然可读。orjson 为可选依赖，未安装时对应的编解码器不可用。
+
+    json            标准库 JSON，缩进排版（默认，与旧版本文件相同）
+    compact-json    标准库 JSON，无空白、UTF-8 直接输出
+    orjson          orjson（已安装时）
+    json-zlib       紧凑 JSON + zlib 压缩的二进制格式
+"""
+import json, zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ZLIB_MAGIC = b"PZJ1"  # json-zlib 文件开头的标识
+
+
+class JsonCodec:
+    name = 'json'
+
+    def encode(self, data):
+        return json.dumps(data, indent=4).encode('utf-8')
+
+    def decode(self, raw):
+        return json.loads(raw)
+
+
+class CompactJsonCodec:
+    name = 'compact-json'
+
+    def encode(self, data):
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, raw):
+        return json.loads(raw)
+
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def encode(self, data):
+        return orjson.dumps(data)
+
+    def decode(self, raw):
+        return orjson.loads(raw)
+
+
+class ZlibJsonCodec:
+    name = 'json-zlib'
+
+    def __init__(self, level=1):
+        self.level = level  # 快照频繁写入，压缩级别取速度优先
+        self.inner = OrjsonCodec() if orjson is not None else CompactJsonCodec()
+
+    def encode(self, data):
+        return ZLIB_MAGIC + zlib.compress(self.inner.encode(data), self.level)
+
+    def decode(self, raw):
+        return self.inner.decode(zlib.decompress(raw[len(ZLIB_MAGIC):]))
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), CompactJsonCodec(), ZlibJsonCodec())}
+if orjson is not None:
+    CODECS['orjson'] = OrjsonCodec()
+
+
+def get_codec(name):
+    """按名称取得编解码器，未知或不可用时抛出 ValueError"""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"不可用的编解码器: {name}（可用: {', '.join(CODECS)}）") from None
+
+
+def decode(raw):
+    """按内容识别格式并解码（文本 JSON 优先用最快的可用解析器）"""
+    if raw.startswith(ZLIB_MAGIC):
+        return CODECS['json-zlib'].decode(raw)
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def load(path):
+    """读取并解码一个快照文件"""
+    with open(path, 'rb') as f:
+        return decode(f.read())
@@ -0,0 +1,246 @@
+"""团队番茄钟服务器（无界面）
+
+所有会话共用一个分层时间轮，由一个 asyncio 协程按刻度推进；每个会话是一个
+core.SessionEngine，规则与桌面版完全相同。客户端通过 TCP（仅本机）或 Unix
+socket 以每行一个 JSON 的方式发送命令，订阅后会收到阶段变化推送。
+
+命令示例:
+    {"cmd": "create", "session": "team-a", "work_duration": 25, "long_break_interval": 4}
+    {"cmd": "subscribe", "session": "team-a"}
+    {"cmd": "start", "session": "team-a"}
+    {"cmd": "pause" | "reset" | "status" | "unsubscribe" | "delete", "session": "team-a"}
+
+用法:
+    python server.py --port 8765
+    python server.py --unix /tmp/pomodoro.sock
+"""
+import sys, json, math, asyncio, logging, argparse
+
+import core
+from timing_wheel import TimingWheel
+
+SETTING_KEYS = ('work_duration', 'short_break_duration', 'long_break_duration', 'long_break_interval')
+
+log = logging.getLogger(__name__)
+
+
+def check_settings(settings):
+    """时长（分钟）必须是有限正数，长休息间隔必须是正整数，否则抛出 ValueError"""
+    for key, value in settings.items():
+        if key not in SETTING_KEYS:
+            raise ValueError(f"未知设置: {key}")
+        kinds = int if key == 'long_break_interval' else (int, float)
+        if isinstance(value, bool) or not isinstance(value, kinds) or not 0 < value < math.inf:
+            raise ValueError(f"无效的 {key}: {value!r}")
+
+
+class LoopClock:
+    """使用事件循环时间（单调）的时钟，供 SessionEngine 使用"""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def now(self):
+        return self.loop.time()
+
+
+class TeamSession:
+    """一个共享番茄钟：状态机 + 时间轮中的下一次阶段切换 + 订阅者"""
+
+    __slots__ = ('name', 'engine', 'handle', 'subscribers')
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.handle = None  # 时间轮中的定时器
+        self.subscribers = set()
+
+
+class TimerServer:
+    """用一个时间轮调度任意多个会话的阶段切换"""
+
+    # 客户端发送缓冲超过该字节数时视为过慢，断开连接
+    MAX_CLIENT_BUFFER = 256 * 1024
+
+    def __init__(self, tick=0.1, loop=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.clock = LoopClock(self.loop)
+        self.wheel = TimingWheel(tick=tick, start=self.clock.now())
+        self.sessions = {}
+        self.transitions = 0  # 已处理的阶段切换数
+        self.lateness = []  # 最近的切换延迟（秒），供压测统计
+        self.record_lateness = False
+        self._driver = None
+
+    # ---- 会话管理 ----
+
+    def create_session(self, name, **settings):
+        """创建会话（已存在时更新设置），设置无效时抛出 ValueError"""
+        check_settings(settings)
+        session = self.sessions.get(name)
+        if session is None:
+            engine = core.SessionEngine(self.clock, **{k: settings[k] for k in SETTING_KEYS if k in settings})
+            session = self.sessions[name] = TeamSession(name, engine)
+            engine.subscribe(lambda event, engine, session=session: self.on_engine_event(session, event))
+        elif settings:
+            engine = session.engine
+            engine.update_settings(*(settings.get(k, getattr(engine, k)) for k in SETTING_KEYS))
+            self.reschedule(session)
+        return session
+
+    def delete_session(self, name):
+        session = self.sessions.pop(name, None)
+        if session is not None and session.handle is not None:
+            session.handle.cancel()
+
+    def start(self, session):
+        session.engine.start()
+        self.reschedule(session)
+
+    def pause(self, session):
+        session.engine.pause()
+        self.reschedule(session)
+
+    def reset(self, session):
+        session.engine.reset()
+        self.reschedule(session)
+
+    def reschedule(self, session):
+        """按状态机当前的截止时间（重新）放入时间轮"""
+        if session.handle is not None:
+            session.handle.cancel()
+            session.handle = None
+        if session.engine.deadline is not None:
+            session.handle = self.wheel.schedule(session.engine.deadline,
+                                                 lambda handle, session=session: self.on_deadline(session))
+
+    def on_deadline(self, session):
+        session.handle = None
+        if self.record_lateness and session.engine.deadline is not None:
+            self.lateness.append(self.clock.now() - session.engine.deadline)
+        try:
+            self.transitions += session.engine.advance()
+            self.reschedule(session)
+        except Exception:
+            # 一个会话出错不能中断时间轮：记录下来，该会话停止计时，其他会话照常
+            log.exception("会话 %s 推进失败，已停止计时", session.name)
+            session.engine.deadline = None
+
+    # ---- 推送 ----
+
+    def status(self, session):
+        engine = session.engine
+        return {'session': session.name, 'phase': engine.phase, 'paused': engine.is_paused,
+                'remaining': engine.seconds_left(), 'cycle': engine.current_cycle}
+
+    def on_engine_event(self, session, event):
+        if event == core.TOMATO_COMPLETED or not session.subscribers:
+            return
+        message = dict(self.status(session), event=event)
+        self.broadcast(session, (json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+
+    def broadcast(self, session, data):
+        for writer in list(session.subscribers):
+            if writer.transport.get_write_buffer_size() > self.MAX_CLIENT_BUFFER:
+                session.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+
+    # ---- 时间轮驱动 ----
+
+    async def drive(self):
+        """按刻度推进时间轮；无论会话多少，每个刻度只唤醒一次"""
+        while True:
+            await asyncio.sleep(max(0.0, self.wheel.next_tick_time() - self.clock.now()))
+            self.wheel.advance(self.clock.now())
+
+    def start_driver(self):
+        if self._driver is None:
+            self._driver = self.loop.create_task(self.drive())
+
+    def stop_driver(self):
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
+
+    # ---- 客户端协议 ----
+
+    async def handle_client(self, reader, writer):
+        subscribed = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = self.handle_command(json.loads(line), writer, subscribed)
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {'ok': False, 'error': str(e)}
+                writer.write((json.dumps(reply, ensure_ascii=False) + "\n").encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for name in subscribed:
+                session = self.sessions.get(name)
+                if session is not None:
+                    session.subscribers.discard(writer)
+            writer.close()
+
+    def handle_command(self, request, writer, subscribed):
+        cmd = request['cmd']
+        name = request['session']
+        if cmd == 'create':
+            session = self.create_session(name, **{k: request[k] for k in SETTING_KEYS if k in request})
+            return dict(self.status(session), ok=True)
+        if cmd == 'delete':
+            self.delete_session(name)
+            return {'ok': True}
+        session = self.sessions[name]
+        if cmd == 'subscribe':
+            session.subscribers.add(writer)
+            subscribed.add(name)
+        elif cmd == 'unsubscribe':
+            session.subscribers.discard(writer)
+            subscribed.discard(name)
+        elif cmd == 'start':
+            self.start(session)
+        elif cmd == 'pause':
+            self.pause(session)
+        elif cmd == 'reset':
+            self.reset(session)
+        elif cmd != 'status':
+            raise ValueError(f"未知命令: {cmd}")
+        return dict(self.status(session), ok=True)
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None):
+        """启动服务并一直运行"""
+        self.start_driver()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="团队番茄钟服务器")
+    parser.add_argument('--port', type=int, default=8765, help="在 127.0.0.1 上监听的端口")
+    parser.add_argument('--unix', help="改为监听 Unix socket 路径")
+    parser.add_argument('--tick', type=float, default=0.1, help="时间轮刻度（秒）")
+    args = parser.parse_args()
+
+    async def run():
+        await TimerServer(tick=args.tick).serve(port=args.port, unix_path=args.unix)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+
+
+class Rollup:
+    """一个统计周期（日/周/月）的累计计数"""
+
+    __slots__ = ('tomatoes', 'internal', 'external', 'planned', 'completed')
+
+    def __init__(self, tomatoes=0, internal=0, external=0, planned=0, completed=0):
+        self.tomatoes = tomatoes  # 完成的番茄数
+        self.internal = internal  # 内部打断
+        self.external = external  # 外部打断
+        self.planned = planned  # 任务计划番茄数
+        self.completed = completed  # 计入任务的番茄数
+
+    @property
+    def completion_ratio(self):
+        """完成番茄 / 计划番茄"""
+        return self.completed / self.planned if self.planned else 0.0
+
+
+def period_key(kind, day):
+    """日期字符串 YYYY-MM-DD 所属周期的键"""
+    if kind == DAY:
+        return day
+    if kind == MONTH:
+        return day[:7]
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def period_range(kind, day):
+    """日期所属周期的起止日期（含两端）"""
+    if kind == DAY:
+        return day, day
+    if kind == MONTH:
+        return day[:7] + "-01", day[:7] + "-31"
+    d = date.fromisoformat(day)
+    start = d - timedelta(days=d.weekday())
+    return start.isoformat(), (start + timedelta(days=6)).isoformat()
+
+
+class StatsAggregator:
+    """增量统计：事件发生时累加日/周/月计数，刷新界面时直接读取
+
+    某个周期第一次被访问时，用历史库的一次索引查询做初始值，之后只做加法。
+    """
+
+    def __init__(self, history=None):
+        self.history = history
+        self.rollups = {}  # (周期类型, 周期键) -> Rollup
+        self.reload_seq = 0  # 最近一次 begin_reload() 的序号
+        self._replay = None  # 重新读取期间累加的增量 [(日期, 计数)]
+
+    def rollup(self, kind, day):
+        """取日期所属周期的累计值，必要时从历史库初始化"""
+        key = (kind, period_key(kind, day))
+        rollup = self.rollups.get(key)
+        if rollup is None:
+            if self.history is not None:
+                rollup = Rollup(*self.history.range_totals(*period_range(kind, day)))
+            else:
+                rollup = Rollup()
+            self.rollups[key] = rollup
+        return rollup
+
+    def add(self, day, tomatoes=0, internal=0, external=0, planned=0, completed=0):
+        """把一次事件的增量累加到所属的日、周、月"""
+        if self._replay is not None:
+            self._replay.append((day, (tomatoes, internal, external, planned, completed)))
+        for kind in (DAY, WEEK, MONTH):
+            rollup = self.rollup(kind, day)
+            rollup.tomatoes += tomatoes
+            rollup.internal += internal
+            rollup.external += external
+            rollup.planned += planned
+            rollup.completed += completed
+
+    def invalidate(self):
+        """丢弃缓存的累计值（历史库被整体改写后调用），未完成的重新读取作废"""
+        self.rollups.clear()
+        self._replay = None
+
+    # 历史库在后台写入线程中被改写时（同步合并），不在界面线程中等待写入完成：
+    # begin_reload() 之后提交的写入都排在重新读取之后，这期间的增量记下来，读取结果到达时再加上。
+
+    def begin_reload(self):
+        """开始一次重新读取，返回序号（之前未完成的重新读取作废）"""
+        self.reload_seq += 1
+        self._replay = []
+        return self.reload_seq
+
+    def read_periods(self, day):
+        """从历史库读取日期所属的日、周、月（可在写入线程中调用）"""
+        return {(kind, period_key(kind, day)): Rollup(*self.history.range_totals(*period_range(kind, day)))
+                for kind in (DAY, WEEK, MONTH)}
+
+    def finish_reload(self, seq, rollups):
+        """用读取结果替换缓存并补上读取期间的增量，已被更新的重新读取取代时返回 False"""
+        if seq != self.reload_seq or self._replay is None:
+            return False
+        replay, self._replay = self._replay, None
+        self.rollups = dict(rollups)
+        for day, counts in replay:
+            self.add(day, *counts)
+        return True
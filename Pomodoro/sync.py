@@ -0,0 +1,242 @@
+"""多设备增量同步：任务计数作为 G-counter（每台设备只增加自己的分量）合并
+
+每台设备在 tomato_timer_sync.db 中保存 (日期, 任务, 字段, 设备) -> 计数。本机的分量变化后
+标记为待推送；同步时一次请求推送待推送的分量，并取回服务器游标之后其他设备的分量，
+合并取各分量的最大值。合并结果与同步顺序、重复次数无关，传输量只与变化量成正比。
+
+用法（本地替身同步服务器）:
+    python sync.py serve --port 8766 --db sync_server.db
+客户端在启动番茄钟时设置环境变量 POMODORO_SYNC_URL=http://127.0.0.1:8766
+"""
+import os, sys, json, uuid, sqlite3, argparse, threading, urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from records import COUNTER_FIELDS
+
+REPLICA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    date TEXT NOT NULL,
+    task TEXT NOT NULL,
+    field TEXT NOT NULL,
+    device TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, task, field, device)
+);
+CREATE INDEX IF NOT EXISTS idx_counters_dirty ON counters (dirty) WHERE dirty = 1;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+SERVER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    date TEXT NOT NULL,
+    task TEXT NOT NULL,
+    field TEXT NOT NULL,
+    device TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (date, task, field, device)
+);
+CREATE INDEX IF NOT EXISTS idx_counters_seq ON counters (seq);
+"""
+
+
+class SyncReplica:
+    """本机的计数副本
+
+    界面线程调用 observe()，同步线程调用 pending_changes() / merge() / acknowledge()，
+    连接由 lock 保护。
+    """
+
+    def __init__(self, db_file):
+        self.is_new = not os.path.exists(db_file)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # 界面线程中提交，不等待 fsync
+        self.conn.executescript(REPLICA_SCHEMA)
+        with self.conn:
+            self.device = self._meta('device') or self._set_meta('device', uuid.uuid4().hex)
+        self.cursor = int(self._meta('cursor') or 0)  # 已取回的服务器序号
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        return value
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def observe(self, day, task):
+        """本机的任务计数变化后调用：把本机分量提高到 (本地值 - 其他设备之和)"""
+        with self.lock, self.conn:
+            for field in COUNTER_FIELDS:
+                own, others = self.conn.execute(
+                    "SELECT COALESCE(SUM(CASE WHEN device = ? THEN value END), 0), "
+                    "COALESCE(SUM(CASE WHEN device != ? THEN value END), 0) "
+                    "FROM counters WHERE date = ? AND task = ? AND field = ?",
+                    (self.device, self.device, day, task.name, field)).fetchone()
+                target = getattr(task, field) - others
+                if target > own:
+                    self.conn.execute(
+                        "INSERT INTO counters (date, task, field, device, value, dirty) VALUES (?, ?, ?, ?, ?, 1) "
+                        "ON CONFLICT (date, task, field, device) DO UPDATE SET value = excluded.value, dirty = 1",
+                        (day, task.name, field, self.device, target))
+
+    def pending_changes(self):
+        """尚未推送的本机分量 [(日期, 任务, 字段, 设备, 值)]"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date, task, field, device, value FROM counters WHERE dirty = 1").fetchall()
+
+    def acknowledge(self, changes, cursor):
+        """推送成功后清除待推送标记（推送期间又变化的分量保留标记），并保存服务器游标"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE counters SET dirty = 0 WHERE date = ? AND task = ? AND field = ? AND device = ? AND value = ?",
+                changes)
+            self.cursor = cursor
+            self._set_meta('cursor', cursor)
+
+    def merge(self, changes):
+        """合并其他设备的分量（取最大值），返回计数变化的 {(日期, 任务)}"""
+        touched = set()
+        with self.lock, self.conn:
+            for day, task, field, device, value in changes:
+                if device == self.device:
+                    continue
+                row = self.conn.execute(
+                    "SELECT value FROM counters WHERE date = ? AND task = ? AND field = ? AND device = ?",
+                    (day, task, field, device)).fetchone()
+                if row is None or value > row[0]:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO counters (date, task, field, device, value, dirty) "
+                        "VALUES (?, ?, ?, ?, ?, 0)", (day, task, field, device, value))
+                    touched.add((day, task))
+        return touched
+
+    def totals(self, day, task):
+        """合并后的计数 {字段: 各设备之和}"""
+        with self.lock:
+            values = dict(self.conn.execute(
+                "SELECT field, SUM(value) FROM counters WHERE date = ? AND task = ? GROUP BY field", (day, task)))
+        return {field: values.get(field, 0) for field in COUNTER_FIELDS}
+
+
+class SyncClient:
+    """通过 HTTP 与同步服务器交换增量（在后台线程中调用 sync()）"""
+
+    def __init__(self, replica, url, timeout=10.0):
+        self.replica = replica
+        self.url = url.rstrip('/') + "/sync"
+        self.timeout = timeout
+
+    def sync(self):
+        """推送本机变化并取回其他设备的变化，返回计数变化的 {(日期, 任务)}"""
+        changes = self.replica.pending_changes()
+        body = json.dumps({'device': self.replica.device, 'since': self.replica.cursor,
+                           'changes': changes}, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            reply = json.loads(response.read())
+        touched = self.replica.merge(reply['changes'])
+        self.replica.acknowledge(changes, reply['cursor'])
+        return touched
+
+
+class SyncServer:
+    """本地替身同步服务器：保存所有设备的分量，每次更新分配递增序号"""
+
+    def __init__(self, db_file=":memory:", host='127.0.0.1', port=8766):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.executescript(SERVER_SCHEMA)
+        self.seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM counters").fetchone()[0]
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/sync':
+                    self.send_error(404)
+                    return
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                    cursor, changes = server.exchange(request['device'], request['since'], request['changes'])
+                except (ValueError, KeyError, TypeError) as e:
+                    self.send_error(400, str(e))
+                    return
+                body = json.dumps({'cursor': cursor, 'changes': changes}, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def exchange(self, device, since, changes):
+        """合并一台设备推送的分量，返回 (新游标, 游标之后其他设备的分量)"""
+        with self.lock, self.conn:
+            for day, task, field, owner, value in changes:
+                row = self.conn.execute(
+                    "SELECT value FROM counters WHERE date = ? AND task = ? AND field = ? AND device = ?",
+                    (day, task, field, owner)).fetchone()
+                if row is None or value > row[0]:
+                    self.seq += 1
+                    self.conn.execute("INSERT OR REPLACE INTO counters (date, task, field, device, value, seq) "
+                                      "VALUES (?, ?, ?, ?, ?, ?)", (day, task, field, owner, value, self.seq))
+            rows = self.conn.execute(
+                "SELECT date, task, field, device, value FROM counters WHERE seq > ? AND device != ? ORDER BY seq",
+                (since, device)).fetchall()
+            return self.seq, rows
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        """在后台线程中运行（测试或嵌入使用）"""
+        self._thread = threading.Thread(target=self.serve_forever, name="sync-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self.httpd.shutdown()  # 没有运行 serve_forever() 时 shutdown() 会一直等待
+            self._thread.join()
+        self.httpd.server_close()
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="番茄钟多设备同步")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve', help="运行本地替身同步服务器")
+    p.add_argument('--port', type=int, default=8766, help="在 127.0.0.1 上监听的端口")
+    p.add_argument('--db', default="sync_server.db", help="服务器数据文件")
+    args = parser.parse_args()
+
+    server = SyncServer(args.db, port=args.port)
+    print(f"同步服务器监听 http://127.0.0.1:{server.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
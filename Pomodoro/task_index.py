@@ -0,0 +1,120 @@
+import itertools
+
+
+class PrefixTrie:
+    """任务名前缀树，用于输入框自动补全"""
+
+    END = ""  # 结点中标记“到此为一个完整名称”的键
+
+    def __init__(self, names=()):
+        self.root = {}
+        self.size = 0
+        for name in names:
+            self.insert(name)
+
+    def insert(self, name):
+        """插入一个名称，已存在时返回 False"""
+        node = self.root
+        for ch in name:
+            node = node.setdefault(ch, {})
+        if self.END in node:
+            return False
+        node[self.END] = name
+        self.size += 1
+        return True
+
+    def __contains__(self, name):
+        node = self.root
+        for ch in name:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return self.END in node
+
+    def __len__(self):
+        return self.size
+
+    def complete(self, prefix, limit=20):
+        """返回以 prefix 开头的名称，最多 limit 个（按字符顺序）"""
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            if self.END in node:
+                results.append(node[self.END])
+            # 逆序压栈，使结果按字符顺序输出
+            stack.extend(node[ch] for ch in sorted((k for k in node if k != self.END), reverse=True))
+        return results
+
+
+class TaskIndex:
+    """今日任务索引：按名称或编号 O(1) 查找，O(1) 在未完成/已完成之间移动
+
+    任务本身仍是 daily_tasks / completed_tasks 中的 TaskRecord，索引只保存引用；
+    编号在本次运行内有效，不写入数据文件。
+    """
+
+    def __init__(self):
+        self.pending = {}  # 名称 -> 未完成任务
+        self.completed = {}  # 名称 -> 最近一个已完成的同名任务
+        self.by_id = {}  # 编号 -> 任务
+        self.ids = {}  # id(任务) -> 编号
+        self.trie = PrefixTrie()
+        self._next_id = itertools.count(1)
+
+    def rebuild(self, daily_tasks, completed_tasks):
+        """任务列表被整体替换后重建索引（前缀树保留已有名称）"""
+        self.pending.clear()
+        self.completed.clear()
+        self.by_id.clear()
+        self.ids.clear()
+        for task in daily_tasks:
+            self.add(task)
+        for task in completed_tasks:
+            self._register(task)
+            self.completed[task.name] = task
+
+    def _register(self, task):
+        task_id = next(self._next_id)
+        self.by_id[task_id] = task
+        self.ids[id(task)] = task_id
+        self.trie.insert(task.name)
+        return task_id
+
+    def add(self, task):
+        """登记一个新的未完成任务，返回其编号"""
+        task_id = self._register(task)
+        self.pending[task.name] = task
+        return task_id
+
+    def mark_completed(self, task):
+        """把任务从未完成移到已完成"""
+        self.pending.pop(task.name, None)
+        self.completed[task.name] = task
+
+    def mark_pending(self, task):
+        """把任务从已完成移回未完成（同步后计划数增加时）"""
+        if self.completed.get(task.name) is task:
+            del self.completed[task.name]
+        self.pending[task.name] = task
+
+    def pending_task(self, name):
+        """按名称查找未完成任务"""
+        return self.pending.get(name)
+
+    def find(self, name):
+        """按名称查找任务，优先返回未完成的"""
+        return self.pending.get(name) or self.completed.get(name)
+
+    def get(self, task_id):
+        """按编号查找任务"""
+        return self.by_id.get(task_id)
+
+    def id_of(self, task):
+        """任务的编号"""
+        return self.ids.get(id(task))
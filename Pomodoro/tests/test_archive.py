@@ -0,0 +1,42 @@
+"""二进制归档：写入中断后重新打开"""
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import HistoryArchive
+
+
+def test_torn_names_line_is_truncated(tmp_path):
+    path = str(tmp_path / "archive.bin")
+    archive = HistoryArchive(path)
+    archive.append_day("2026-10-15", [(1.0, "写代码", 'tomato', 'work')])
+    archive.close()
+    good_size = os.path.getsize(path + ".names")
+    # 写任务名时崩溃，只写出半个名字
+    with open(path + ".names", 'ab') as f:
+        f.write('"读'.encode('utf-8'))
+
+    archive = HistoryArchive(path)
+    assert os.path.getsize(path + ".names") == good_size
+    archive.append_day("2026-10-16", [(2.0, "读书", 'tomato', 'work'), (3.0, "写代码", 'internal', 'work')])
+    archive.close()
+
+    archive = HistoryArchive(path)
+    assert archive.names == ["写代码", "读书"]
+    assert [record[1:3] for record in archive.records()] == [
+        ("2026-10-15", "写代码"), ("2026-10-16", "读书"), ("2026-10-16", "写代码")]
+    archive.close()
+
+
+def test_torn_record_is_truncated(tmp_path):
+    path = str(tmp_path / "archive.bin")
+    archive = HistoryArchive(path)
+    archive.append_day("2026-10-15", [(1.0, "写代码", 'tomato', 'work')])
+    archive.close()
+    with open(path, 'ab') as f:
+        f.write(b"\0" * 5)
+
+    archive = HistoryArchive(path)
+    assert len(archive) == 1
+    assert archive.totals() == (1, 0, 0)
+    archive.close()
@@ -0,0 +1,111 @@
+"""会话状态机：用虚拟时钟驱动阶段切换、暂停/继续和长休息节奏"""
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+from core import SessionEngine, VirtualClock, WORK, SHORT_BREAK, LONG_BREAK, IDLE
+
+
+def make_engine(**settings):
+    clock = VirtualClock(1000.0)
+    engine = SessionEngine(clock, **settings)
+    log = []
+    engine.subscribe(lambda event, e: log.append((event, e.phase, e.current_cycle, e.clock.now())))
+    return engine, clock, log
+
+
+def test_work_then_short_break():
+    engine, clock, log = make_engine()
+    assert engine.phase == IDLE and not engine.is_running
+    engine.start()
+    assert engine.phase == WORK and engine.deadline == 1000.0 + 25 * 60
+
+    clock.advance(25 * 60 - 0.5)
+    assert engine.advance() == 0
+    assert engine.display_seconds() == 1
+    clock.advance(0.5)
+    assert engine.advance() == 1
+    assert (engine.phase, engine.current_cycle) == (SHORT_BREAK, 1)
+    assert engine.seconds_left() == 5 * 60
+    assert [event for event, *_ in log] == [core.STATE_CHANGED, core.PHASE_CHANGED,
+                                            core.TOMATO_COMPLETED, core.PHASE_CHANGED]
+
+
+def test_late_advance_catches_up_without_drift():
+    engine, clock, log = make_engine(work_duration=1, short_break_duration=1)
+    engine.start()
+    # 错过了多个阶段（例如界面卡顿），一次 advance() 全部补上，截止时间从上一阶段接续
+    clock.advance(60 * 3 + 10)
+    assert engine.advance() == 3
+    assert (engine.phase, engine.current_cycle) == (SHORT_BREAK, 2)
+    assert engine.deadline == 1000.0 + 60 * 4
+    assert engine.seconds_left() == 50
+
+
+def test_pause_and_resume_keep_exact_remaining_time():
+    engine, clock, _ = make_engine()
+    engine.start()
+    clock.advance(100.25)
+    engine.pause()
+    assert engine.is_paused and not engine.is_running
+    assert engine.seconds_left() == 25 * 60 - 100.25
+
+    # 暂停期间时间流逝不影响剩余时间，也不会切换阶段
+    clock.advance(3600)
+    assert engine.advance() == 0
+    assert engine.seconds_left() == 25 * 60 - 100.25
+
+    engine.start()
+    assert engine.deadline == clock.now() + 25 * 60 - 100.25
+    clock.advance(25 * 60 - 100.25)
+    engine.advance()
+    assert (engine.phase, engine.current_cycle) == (SHORT_BREAK, 1)
+
+
+def test_long_break_cadence():
+    engine, clock, log = make_engine(work_duration=25, short_break_duration=5,
+                                     long_break_duration=15, long_break_interval=3)
+    engine.start()
+    engine.run_until(clock.now() + 24 * 3600)
+    breaks = [(phase, cycle) for event, phase, cycle, _ in log
+              if event == core.PHASE_CHANGED and phase != WORK][:6]
+    assert breaks == [(SHORT_BREAK, 1), (SHORT_BREAK, 2), (LONG_BREAK, 3),
+                      (SHORT_BREAK, 4), (SHORT_BREAK, 5), (LONG_BREAK, 6)]
+    # 一轮 3 个番茄：3 × 25 + 2 × 5 + 15 分钟
+    third_long_break = [now for event, phase, cycle, now in log
+                        if event == core.PHASE_CHANGED and phase == LONG_BREAK][2]
+    assert third_long_break == 1000.0 + 3 * (3 * 25 + 2 * 5 + 15) * 60 - 15 * 60
+
+
+def test_reset_keeps_completed_tomatoes():
+    engine, clock, _ = make_engine(work_duration=1)
+    engine.start()
+    engine.run_until(clock.now() + 61)
+    engine.reset()
+    assert (engine.phase, engine.current_cycle, engine.is_running) == (IDLE, 1, False)
+    assert engine.seconds_left() == 60
+    clock.advance(600)
+    assert engine.advance() == 0
+
+
+def test_update_settings_scales_remaining_work_time():
+    engine, clock, _ = make_engine(work_duration=20)
+    engine.start()
+    clock.advance(10 * 60)
+    engine.update_settings(40, 5, 15, 4)
+    assert engine.seconds_left() == 20 * 60
+    engine.pause()
+    engine.update_settings(20, 5, 15, 4)
+    assert engine.paused_left == 10 * 60
+
+
+def test_next_wakeup_lands_on_second_boundaries():
+    engine, clock, _ = make_engine(work_duration=1)
+    engine.start()
+    clock.advance(0.3)
+    assert abs(engine.next_wakeup() - 0.7) < 1e-9
+    clock.advance(0.7)
+    assert engine.display_seconds() == 59
+    clock.advance(59)
+    assert engine.next_wakeup() == 0.0
@@ -0,0 +1,43 @@
+"""历史库：导入旧的按日期 JSON 文件"""
+import os, sys, json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HistoryStore
+
+
+def write_day(data_dir, day, daily_tasks, completed_tasks):
+    with open(os.path.join(data_dir, f"{day}.json"), 'w', encoding='utf-8') as f:
+        json.dump({'date': day, 'daily_tasks': daily_tasks, 'completed_tasks': completed_tasks}, f, ensure_ascii=False)
+
+
+def test_same_name_tasks_are_summed(tmp_path):
+    # 完成后又重新添加的同名任务
+    write_day(tmp_path, "2026-10-15",
+              [{'name': "写代码", 'planned': 2, 'completed': 0, 'internal_interruptions': 1,
+                'external_interruptions': 1}],
+              [{'name': "写代码", 'planned': 1, 'completed': 1, 'internal_interruptions': 3,
+                'external_interruptions': 0}])
+    history = HistoryStore(str(tmp_path / "history.db"))
+    assert history.import_json_dir(str(tmp_path)) == (1, [])
+    [task] = history.tasks_for_date("2026-10-15")
+    assert (task.name, task.planned, task.completed, task.internal_interruptions,
+            task.external_interruptions) == ("写代码", 3, 1, 4, 1)
+    assert history.range_totals("2026-10-15", "2026-10-15") == (1, 4, 1, 3, 1)
+    history.close()
+
+
+def test_bad_file_does_not_abort_the_import(tmp_path):
+    write_day(tmp_path, "2026-10-14", [{'name': "读书", 'planned': 1, 'completed': 1}], [])
+    with open(tmp_path / "2026-10-15.json", 'w') as f:
+        f.write("{not json")
+    write_day(tmp_path, "2026-10-16", [{'name': "写代码", 'planned': 2, 'completed': 2}], [])
+    history = HistoryStore(str(tmp_path / "history.db"))
+    count, failed = history.import_json_dir(str(tmp_path))
+    assert count == 2
+    assert [os.path.basename(path) for path, _ in failed] == ["2026-10-15.json"]
+    assert [t.name for t in history.tasks_for_date("2026-10-14")] == ["读书"]
+    assert [t.name for t in history.tasks_for_date("2026-10-16")] == ["写代码"]
+    # 已导入的文件不会重复导入
+    assert history.import_json_dir(str(tmp_path))[0] == 0
+    history.close()
@@ -0,0 +1,104 @@
+"""事件日志：崩溃后重放（写了一半的最后一行、写快照后未清空日志）"""
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import journal as journal_module
+from journal import EventJournal, TASK_ADDED, TOMATO_COMPLETED
+
+
+def make_journal(tmp_path):
+    return EventJournal(str(tmp_path / "data.json"))
+
+
+def test_replay_without_snapshot(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append(TASK_ADDED, name="写代码", planned=2)
+    journal.append(TOMATO_COMPLETED, task="写代码")
+    journal.close()
+
+    snapshot, events = make_journal(tmp_path).load()
+    assert snapshot is None
+    assert [(e['seq'], e['type']) for e in events] == [(1, TASK_ADDED), (2, TOMATO_COMPLETED)]
+
+
+def test_torn_append_is_dropped_and_truncated(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append(TASK_ADDED, name="写代码", planned=2)
+    journal.append(TOMATO_COMPLETED, task="写代码")
+    journal.close()
+    good_size = os.path.getsize(journal.journal_file)
+    # 崩溃时最后一行只写了一半
+    with open(journal.journal_file, 'a') as f:
+        f.write('{"seq": 3, "type": "tomato_comp')
+
+    journal = make_journal(tmp_path)
+    _, events = journal.load()
+    assert [e['seq'] for e in events] == [1, 2]
+    assert os.path.getsize(journal.journal_file) == good_size
+
+    # 截断后继续追加，序号接续，再次重放得到完整的日志
+    journal.append(TOMATO_COMPLETED, task="写代码")
+    journal.close()
+    _, events = make_journal(tmp_path).load()
+    assert [e['seq'] for e in events] == [1, 2, 3]
+
+
+def test_unterminated_last_line_is_kept(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append(TASK_ADDED, name="写代码", planned=2)
+    journal.close()
+    # 最后一行完整，但崩溃时换行符还没写出
+    with open(journal.journal_file, 'rb+') as f:
+        f.truncate(os.path.getsize(journal.journal_file) - 1)
+
+    journal = make_journal(tmp_path)
+    _, events = journal.load()
+    assert [e['seq'] for e in events] == [1]
+    journal.append(TOMATO_COMPLETED, task="写代码")
+    journal.close()
+    _, events = make_journal(tmp_path).load()
+    assert [e['seq'] for e in events] == [1, 2]
+
+
+def test_journal_is_utf8_regardless_of_locale(tmp_path, monkeypatch):
+    import builtins
+
+    def gbk_open(file, mode='r', *args, **kwargs):
+        # 模拟 GBK 区域设置：文本模式默认按 GBK 编码
+        if 'b' not in mode:
+            kwargs.setdefault('encoding', 'gbk')
+        return builtins.open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(journal_module, 'open', gbk_open, raising=False)
+    journal = make_journal(tmp_path)
+    journal.append(TASK_ADDED, name="写代码", planned=2)
+    journal.append(TOMATO_COMPLETED, task="写代码")
+    journal.close()
+    raw = open(journal.journal_file, 'rb').read()
+    assert "写代码".encode('utf-8') in raw
+
+    _, events = make_journal(tmp_path).load()
+    assert [e['name'] for e in events[:1]] == ["写代码"]
+    assert len(events) == 2
+
+
+def test_events_already_in_snapshot_are_skipped(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.append(TASK_ADDED, name="写代码", planned=2)
+    journal.append(TOMATO_COMPLETED, task="写代码")
+    stale = open(journal.journal_file, 'rb').read()
+    journal.write_snapshot({'daily_tasks': [{'name': "写代码", 'planned': 2, 'completed': 1}]})
+    # 写快照后、清空日志前崩溃：日志中仍有快照已包含的事件
+    with open(journal.journal_file, 'wb') as f:
+        f.write(stale)
+    journal.close()
+
+    journal = make_journal(tmp_path)
+    snapshot, events = journal.load()
+    assert snapshot['journal_seq'] == 2
+    assert events == []
+    assert journal.append(TOMATO_COMPLETED, task="写代码")['seq'] == 3
+    journal.close()
+    snapshot, events = make_journal(tmp_path).load()
+    assert [e['seq'] for e in events] == [3]
@@ -0,0 +1,47 @@
+"""增量统计：在后台重新读取期间发生的事件不丢失"""
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stats
+from history import HistoryStore
+from records import TaskRecord
+
+DAY = "2026-10-17"
+
+
+def test_reload_keeps_events_recorded_while_reading(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"))
+    aggregator = stats.StatsAggregator(history)
+    assert aggregator.rollup(stats.DAY, DAY).planned == 0
+
+    # 同步合并写入历史库，然后开始重新读取
+    history.save_task(DAY, TaskRecord("写代码", planned=3, completed=1))
+    seq = aggregator.begin_reload()
+    rollups = aggregator.read_periods(DAY)
+    # 读取结果到达界面线程之前又完成了一个番茄
+    aggregator.add(DAY, tomatoes=1, completed=1)
+    assert aggregator.finish_reload(seq, rollups)
+
+    for kind in (stats.DAY, stats.WEEK, stats.MONTH):
+        rollup = aggregator.rollup(kind, DAY)
+        assert (rollup.planned, rollup.completed, rollup.tomatoes) == (3, 2, 1)
+    # 增量只补一次
+    aggregator.add(DAY, internal=1)
+    assert aggregator.rollup(stats.DAY, DAY).completed == 2
+    history.close()
+
+
+def test_superseded_reload_is_ignored(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"))
+    aggregator = stats.StatsAggregator(history)
+    first = aggregator.begin_reload()
+    stale = aggregator.read_periods(DAY)
+    second = aggregator.begin_reload()
+    assert not aggregator.finish_reload(first, stale)
+    assert aggregator.finish_reload(second, aggregator.read_periods(DAY))
+    # 被 invalidate() 作废的重新读取也不再生效
+    third = aggregator.begin_reload()
+    aggregator.invalidate()
+    assert not aggregator.finish_reload(third, stale)
+    history.close()
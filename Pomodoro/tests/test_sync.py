@@ -0,0 +1,113 @@
+"""多设备同步：合并与顺序、重复次数无关，多台设备最终一致"""
+import os, sys, itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import TaskRecord
+from sync import SyncReplica, SyncServer, SyncClient
+
+DAY = "2026-10-17"
+
+# 其他设备推送来的分量，其中同一分量出现多次（旧值、新值）
+CHANGES = [
+    (DAY, "写代码", "completed", "a", 1),
+    (DAY, "写代码", "completed", "a", 3),
+    (DAY, "写代码", "planned", "a", 4),
+    (DAY, "写代码", "completed", "b", 2),
+    (DAY, "写代码", "internal_interruptions", "b", 1),
+    (DAY, "读书", "completed", "b", 1),
+]
+
+
+def replica(tmp_path, name):
+    return SyncReplica(str(tmp_path / f"{name}.db"))
+
+
+def test_merge_is_commutative(tmp_path):
+    results = []
+    for i, order in enumerate(itertools.permutations(CHANGES)):
+        if i % 60:  # 720 种顺序中抽取一部分
+            continue
+        r = replica(tmp_path, f"order{i}")
+        for change in order:
+            r.merge([change])
+        results.append((r.totals(DAY, "写代码"), r.totals(DAY, "读书")))
+        r.close()
+    assert len(results) == 12
+    assert all(result == results[0] for result in results)
+    assert results[0][0]['completed'] == 5 and results[0][0]['planned'] == 4
+
+
+def test_merge_is_idempotent(tmp_path):
+    r = replica(tmp_path, "r")
+    assert r.merge(CHANGES) == {(DAY, "写代码"), (DAY, "读书")}
+    totals = r.totals(DAY, "写代码")
+    assert r.merge(CHANGES) == set()
+    assert r.merge(CHANGES[:2]) == set()  # 旧值不会覆盖新值
+    assert r.totals(DAY, "写代码") == totals
+    r.close()
+
+
+def test_own_component_is_not_overwritten_by_echo(tmp_path):
+    r = replica(tmp_path, "r")
+    r.observe(DAY, TaskRecord("写代码", planned=2, completed=2))
+    assert r.merge([(DAY, "写代码", "completed", r.device, 0)]) == set()
+    assert r.totals(DAY, "写代码")['completed'] == 2
+    r.close()
+
+
+def test_replicas_converge_through_server(tmp_path):
+    server = SyncServer(port=0)
+    try:
+        converge(server, replica(tmp_path, "a"), replica(tmp_path, "b"))
+    finally:
+        server.close()
+
+
+def converge(server, a, b):
+    """两台设备通过服务器交换增量，最终计数一致"""
+    def sync(r):
+        changes = r.pending_changes()
+        cursor, incoming = server.exchange(r.device, r.cursor, changes)
+        touched = r.merge(incoming)
+        r.acknowledge(changes, cursor)
+        return touched
+
+    # 两台设备离线时各自完成番茄
+    a.observe(DAY, TaskRecord("写代码", planned=3, completed=2))
+    b.observe(DAY, TaskRecord("写代码", planned=3, completed=1, external_interruptions=1))
+    sync(a)
+    assert sync(b) == {(DAY, "写代码")}
+    assert sync(a) == {(DAY, "写代码")}
+    assert a.totals(DAY, "写代码") == b.totals(DAY, "写代码")
+    assert a.totals(DAY, "写代码")['completed'] == 3
+
+    # 本机在合并结果上继续增加，只推送增量
+    merged = a.totals(DAY, "写代码")
+    a.observe(DAY, TaskRecord("写代码", **{**merged, 'completed': merged['completed'] + 1}))
+    assert a.pending_changes() == [(DAY, "写代码", "completed", a.device, 3)]
+    sync(a)
+    sync(b)
+    assert a.pending_changes() == b.pending_changes() == []
+    assert a.totals(DAY, "写代码") == b.totals(DAY, "写代码")
+    assert b.totals(DAY, "写代码")['completed'] == 4
+    # 已同步后再同步不再有变化
+    assert sync(a) == sync(b) == set()
+    a.close()
+    b.close()
+
+
+def test_client_over_http(tmp_path):
+    server = SyncServer(port=0)
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}"
+        a, b = replica(tmp_path, "a"), replica(tmp_path, "b")
+        a.observe(DAY, TaskRecord("写代码", completed=2))
+        SyncClient(a, url).sync()
+        assert SyncClient(b, url).sync() == {(DAY, "写代码")}
+        assert b.totals(DAY, "写代码")['completed'] == 2
+        a.close()
+        b.close()
+    finally:
+        server.close()
@@ -0,0 +1,77 @@
+"""分层时间轮：跨层级、溢出列表的定时器都在正确的刻度触发"""
+import os, sys, math, random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timing_wheel import TimingWheel
+
+
+def run(wheel, whens, until, step=1):
+    """逐刻度推进，返回 {when: 触发时的刻度}"""
+    fired = {}
+    for when in whens:
+        wheel.schedule(when, lambda handle, when=when: fired.setdefault(when, wheel.current_tick))
+    now = wheel.current_tick * wheel.tick
+    while now < until:
+        now += step
+        wheel.advance(now)
+    return fired
+
+
+def test_fires_exactly_across_levels_and_overflow():
+    # size=4, levels=3：0 层 4 个刻度，1 层 16，2 层 64，更远的进入溢出列表
+    wheel = TimingWheel(tick=1.0, size=4, levels=3)
+    whens = [1, 2, 3, 4, 5, 15, 16, 17, 63, 64, 65, 100, 255, 256, 1000]
+    fired = run(wheel, whens, 1100)
+    assert fired == {when: when for when in whens}
+    assert wheel.count == 0
+
+
+def test_fractional_deadlines_round_up_to_next_tick():
+    wheel = TimingWheel(tick=0.5, size=8, levels=2, start=10.0)
+    whens = [10.2, 10.5, 13.01, 47.9, 200.25]
+    fired = run(wheel, whens, 210, step=0.5)
+    assert fired == {when: math.ceil(when / 0.5) for when in whens}
+
+
+def test_due_at_insert_fires_on_next_advance():
+    # 插入时已经到期的定时器在下一次 advance() 推进刻度之前触发
+    wheel = TimingWheel(tick=1.0, size=4, levels=2, start=50.0)
+    fired = run(wheel, [10.0, 50.0], 51)
+    assert fired == {10.0: 50, 50.0: 50}
+
+
+def test_large_jump_fires_everything_once():
+    wheel = TimingWheel(tick=1.0, size=4, levels=2)
+    rng = random.Random(1)
+    whens = [rng.uniform(0, 500) for _ in range(300)]
+    fired = []
+    for when in whens:
+        wheel.schedule(when, lambda handle, when=when: fired.append(when))
+    assert wheel.advance(1000) == len(whens)
+    assert sorted(fired) == sorted(whens)
+
+
+def test_cancelled_timers_do_not_fire():
+    wheel = TimingWheel(tick=1.0, size=4, levels=2)
+    fired = []
+    keep = wheel.schedule(5, lambda handle: fired.append(5))
+    drop = wheel.schedule(40, lambda handle: fired.append(40))
+    drop.cancel()
+    wheel.advance(100)
+    assert fired == [5] and not keep.cancelled
+
+
+def test_callback_can_reschedule():
+    wheel = TimingWheel(tick=1.0, size=4, levels=2)
+    ticks = []
+
+    def again(handle):
+        ticks.append(wheel.current_tick)
+        if len(ticks) < 5:
+            wheel.schedule(wheel.current_tick + 7, again)
+
+    wheel.schedule(3, again)
+    for now in range(1, 60):
+        wheel.advance(now)
+    assert ticks == [3, 10, 17, 24, 31]
@@ -0,0 +1,102 @@
+import math
+
+
+class TimerHandle:
+    """时间轮中的一个定时器，cancel() 后不再触发"""
+
+    __slots__ = ('expiry_tick', 'callback', 'cancelled')
+
+    def __init__(self, expiry_tick, callback):
+        self.expiry_tick = expiry_tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimingWheel:
+    """分层时间轮：插入和取消 O(1)，每个刻度只处理到期的槽位
+
+    第 0 层每槽一个刻度，第 L 层每槽 size**L 个刻度；超出最高层范围的定时器
+    放在溢出列表里，最高层转满一圈时再重新分配。
+    """
+
+    def __init__(self, tick=1.0, size=64, levels=4, start=0.0):
+        self.tick = tick  # 一个刻度的秒数
+        self.size = size
+        self.levels = [[[] for _ in range(size)] for _ in range(levels)]
+        self.overflow = []
+        self.current_tick = int(start // tick)
+        self.ready = []  # 插入时已经到期的定时器
+        self.count = 0  # 未触发的定时器数（含已取消但未清理的）
+
+    def schedule(self, when, callback):
+        """在时间 when（与 start 同一时钟）之后触发 callback(handle)"""
+        handle = TimerHandle(math.ceil(when / self.tick), callback)
+        self._insert(handle)
+        self.count += 1
+        return handle
+
+    def _insert(self, handle):
+        delta = handle.expiry_tick - self.current_tick
+        if delta <= 0:
+            self.ready.append(handle)
+            return
+        span = self.size
+        for level, slots in enumerate(self.levels):
+            if delta < span:
+                unit = span // self.size
+                slots[(handle.expiry_tick // unit) % self.size].append(handle)
+                return
+            span *= self.size
+        self.overflow.append(handle)
+
+    def advance(self, now):
+        """把时间轮推进到 now，触发所有到期的定时器，返回触发数"""
+        fired = self._fire(self.ready)
+        self.ready = []
+        target = int(now // self.tick)
+        while self.current_tick < target:
+            self.current_tick += 1
+            self._cascade()
+            slot = self.levels[0][self.current_tick % self.size]
+            if slot:
+                self.levels[0][self.current_tick % self.size] = []
+                fired += self._fire(slot)
+            if self.ready:
+                # 回调中新安排的已到期定时器
+                ready, self.ready = self.ready, []
+                fired += self._fire(ready)
+        return fired
+
+    def _cascade(self):
+        # 高层槽位到期时把其中的定时器重新分配到低层
+        unit = self.size
+        for level in range(1, len(self.levels)):
+            if self.current_tick % unit:
+                return
+            index = (self.current_tick // unit) % self.size
+            slot = self.levels[level][index]
+            if slot:
+                self.levels[level][index] = []
+                for handle in slot:
+                    self._insert(handle)
+            unit *= self.size
+        if self.current_tick % unit == 0 and self.overflow:
+            overflow, self.overflow = self.overflow, []
+            for handle in overflow:
+                self._insert(handle)
+
+    def _fire(self, handles):
+        fired = 0
+        for handle in handles:
+            self.count -= 1
+            if not handle.cancelled:
+                handle.callback(handle)
+                fired += 1
+        return fired
+
+    def next_tick_time(self):
+        """下一个刻度的时间"""
+        return (self.current_tick + 1) * self.tick
@@ -0,0 +1,100 @@
+from PyQt5.QtCore import Qt, QRect, QSize
+from PyQt5.QtGui import QColor, QFontMetrics, QPainter, QPixmap
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+
+class TimerDisplay(QWidget):
+    """自绘的计时器数字：字形预先渲染成位图缓存，文字变化时只重绘变化的字符
+
+    每个字符占一个等宽格子（按数字中最宽的字形计算），因此 "24:59" -> "24:58"
+    只需重绘最后一格；换颜色时不重建调色板，只切换到另一组缓存字形。
+    """
+
+    def __init__(self, text="", font=None, parent=None):
+        super().__init__(parent)
+        self._text = text
+        self._color = QColor("#333333")
+        self._glyphs = {}  # (字符, 颜色) -> QPixmap
+        self._cells = []  # 每个字符的格子区域
+        if font is not None:
+            self.setFont(font)
+        self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+        self._measure()
+
+    def _measure(self):
+        metrics = QFontMetrics(self.font())
+        self._cell_width = max(metrics.horizontalAdvance(ch) for ch in "0123456789:")
+        self._cell_height = metrics.height()
+        self._glyphs.clear()
+        self._layout()
+
+    def _layout(self):
+        # 所有格子整体水平、垂直居中
+        total = self._cell_width * len(self._text)
+        x = (self.width() - total) // 2
+        y = (self.height() - self._cell_height) // 2
+        self._cells = [QRect(x + i * self._cell_width, y, self._cell_width, self._cell_height)
+                       for i in range(len(self._text))]
+
+    def _glyph(self, ch):
+        key = (ch, self._color.rgba())
+        pixmap = self._glyphs.get(key)
+        if pixmap is None:
+            ratio = self.devicePixelRatioF()
+            pixmap = QPixmap(int(self._cell_width * ratio), int(self._cell_height * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(self.font())
+            painter.setPen(self._color)
+            painter.drawText(QRect(0, 0, self._cell_width, self._cell_height), Qt.AlignCenter, ch)
+            painter.end()
+            self._glyphs[key] = pixmap
+        return pixmap
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        """更新文字，长度不变时只重绘变化的格子"""
+        if text == self._text:
+            return
+        old = self._text
+        self._text = text
+        if len(text) != len(old):
+            self._layout()
+            self.update()
+            return
+        for i, (a, b) in enumerate(zip(old, text)):
+            if a != b:
+                self.update(self._cells[i])
+
+    def setColor(self, color):
+        color = QColor(color)
+        if color != self._color:
+            self._color = color
+            self.update()
+
+    def changeEvent(self, event):
+        if event.type() == event.FontChange:
+            self._measure()
+            self.updateGeometry()
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        self._layout()
+        super().resizeEvent(event)
+
+    def sizeHint(self):
+        return QSize(self._cell_width * max(5, len(self._text)) + 20, self._cell_height + 20)
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
+
+    def paintEvent(self, event):
+        region = event.rect()
+        painter = QPainter(self)
+        for ch, cell in zip(self._text, self._cells):
+            if cell.intersects(region):
+                painter.drawPixmap(cell.topLeft(), self._glyph(ch))
+        painter.end()